@@ -0,0 +1,131 @@
+"""Compare per-chunk ``collection.add`` with the batched, pipelined ingestion path.
+
+Runs against an in-process Chroma (EphemeralClient) with a cheap hashing
+embedding function so the numbers measure round-trips, not the embedding
+model. ``--latency-ms`` adds a fixed delay per write call to mimic the
+network hop to Chroma Cloud.
+
+    python -m benchmarks.bench_chroma_ingest --words 200000 --latency-ms 20
+"""
+import argparse
+import hashlib
+import random
+import time
+from datetime import datetime
+
+import chromadb
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from utlity.chromadb import ChromaDBManager
+
+
+class HashEmbeddingFunction(EmbeddingFunction):
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            vectors.append([digest[i % len(digest)] / 255.0 for i in range(self.dim)])
+        return vectors
+
+
+class HashEmbedder:
+    """Stand-in for EmbeddingEngine with the same hashing vectors."""
+
+    def __init__(self, dim: int = 64):
+        self.function = HashEmbeddingFunction(dim)
+
+    def embed_documents(self, texts):
+        return self.function(list(texts))
+
+    def embed_query(self, text):
+        return self.function([text])[0]
+
+
+class SlowCollection:
+    """Adds a fixed delay to every write call on the wrapped collection."""
+
+    def __init__(self, collection, latency: float):
+        self.collection = collection
+        self.latency = latency
+
+    def add(self, **kwargs):
+        time.sleep(self.latency)
+        return self.collection.add(**kwargs)
+
+    def upsert(self, **kwargs):
+        time.sleep(self.latency)
+        return self.collection.upsert(**kwargs)
+
+
+def make_document(words: int, tables: int) -> dict:
+    vocabulary = [f"word{i}" for i in range(5000)]
+    rng = random.Random(0)
+    text = " ".join(rng.choice(vocabulary) for _ in range(words))
+    table_rows = "\n".join(f"INV-{i},{rng.randint(1, 999)}.00,paid" for i in range(2000))
+    return {
+        "filename": "synthetic.pdf",
+        "mime_type": "application/pdf",
+        "processing_method": "benchmark",
+        "timestamp": datetime.now().isoformat(),
+        "text": text,
+        "page_count": 1,
+        "tables": [{"table_id": i + 1, "csv_data": "invoice,amount,status\n" + table_rows} for i in range(tables)],
+        "has_tables": tables > 0,
+        "has_images": False,
+    }
+
+
+def per_chunk_ingest(manager: ChromaDBManager, document_data: dict) -> int:
+    # The original add_document loop: one add() per chunk.
+    chunks = list(manager.iter_chunks(document_data))
+    for i, (chunk, _) in enumerate(chunks):
+        manager.collection.add(
+            documents=[chunk],
+            metadatas=[{"filename": document_data["filename"], "chunk_index": i}],
+            ids=[f"legacy_{i}"]
+        )
+    return len(chunks)
+
+
+def batched_ingest(manager: ChromaDBManager, document_data: dict, batch_size: int) -> int:
+    manager.add_document(document_data, batch_size=batch_size)
+    return sum(1 for _ in manager.iter_chunks(document_data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=100_000)
+    parser.add_argument("--tables", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    client = chromadb.EphemeralClient()
+    document_data = make_document(args.words, args.tables)
+    embedding_function = HashEmbeddingFunction()
+
+    results = {}
+    for mode in ("per_chunk", "batched"):
+        manager = ChromaDBManager(collection_name=f"bench_{mode}", client=client, embedder=HashEmbedder())
+        collection = client.create_collection(f"bench_{mode}_hashed", embedding_function=embedding_function)
+        manager.collection = SlowCollection(collection, args.latency_ms / 1000)
+
+        start = time.perf_counter()
+        if mode == "per_chunk":
+            count = per_chunk_ingest(manager, document_data)
+        else:
+            count = batched_ingest(manager, document_data, args.batch_size)
+        elapsed = time.perf_counter() - start
+
+        results[mode] = count / elapsed
+        print(f"{mode:>10}: {count} chunks in {elapsed:.2f}s -> {results[mode]:.1f} chunks/sec")
+
+    print(f"speedup: {results['batched'] / results['per_chunk']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
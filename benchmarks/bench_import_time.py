@@ -0,0 +1,92 @@
+"""Start-up budget: import time of every utlity module, each in a fresh interpreter.
+
+A module fails when its import takes longer than ``--budget`` seconds or
+when it drags in one of the heavy libraries (Docling, OpenCV, LangChain,
+chromadb...), which must only load on first use. Exits 1 on any failure,
+so it can gate CI like benchmarks.run_benchmarks.
+
+    python -m benchmarks.bench_import_time --budget 1.0
+    python -m benchmarks.bench_import_time utlity.llm utlity.chromadb
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = (
+    "docling", "docling_core", "cv2", "PIL", "huggingface_hub", "langchain_core", "langchain_google_genai",
+    "chromadb", "pandas", "pyarrow", "pypdfium2", "torch", "sentence_transformers", "onnxruntime",
+)
+
+# Modules whose whole job is wrapping one of them.
+ALLOWED_HEAVY = {
+    "utlity.image_preprocess": {"cv2"},
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": seconds, "heavy": heavy}}))
+"""
+
+
+def library_modules():
+    return sorted(
+        f"utlity.{os.path.splitext(os.path.basename(path))[0]}"
+        for path in glob.glob(os.path.join(ROOT, "utlity", "*.py"))
+        if not os.path.basename(path).startswith("_")
+    )
+
+
+def measure(module: str, repeat: int) -> dict:
+    """Best of ``repeat`` cold imports, so one slow disk read doesn't fail the budget."""
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            return {"seconds": None, "heavy": [], "error": completed.stderr.strip().splitlines()[-1]}
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", help="modules to check (default: every utlity module)")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed per module import")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'module':<28} {'seconds':>8}  heavy imports")
+    for module in args.modules or library_modules():
+        result = measure(module, args.repeat)
+        if result.get("error"):
+            failures += 1
+            print(f"{module:<28} {'error':>8}  {result['error']}")
+            continue
+        heavy = set(result["heavy"]) - ALLOWED_HEAVY.get(module, set())
+        over = result["seconds"] > args.budget
+        failures += over or bool(heavy)
+        flag = " OVER BUDGET" if over else ""
+        print(f"{module:<28} {result['seconds']:>8.3f}  {', '.join(sorted(heavy)) or '-'}{flag}")
+
+    if failures:
+        print(f"\n{failures} module(s) over the {args.budget}s budget or importing heavy dependencies")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
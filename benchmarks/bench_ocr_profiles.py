@@ -0,0 +1,151 @@
+"""Speed and character accuracy of each OCR profile on the synthetic scan corpus.
+
+Every profile converts the same image-only PDFs (benchmarks/synthetic.py),
+so each page goes through OCR. Character accuracy is 1 - edit distance /
+reference length per page, computed after lowercasing and keeping only
+letters, digits and dots, since table borders and markdown pipes aren't
+part of the printed text. Prints a Markdown table for the README and
+writes the raw numbers as JSON.
+
+    python -m benchmarks.bench_ocr_profiles --pdfs 2 --pages 4 --noise 0.01
+    python -m benchmarks.bench_ocr_profiles --profiles fast accurate --output profiles.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import tempfile
+import time
+from dataclasses import asdict
+
+import numpy as np
+
+from utlity.env_load import env_data
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9.]+", " ", text.lower()).split())
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance, one numpy row per character of ``a``."""
+    if not a or not b:
+        return len(a) + len(b)
+    b_codes = np.frombuffer(b.encode("utf-32-le"), dtype=np.uint32)
+    steps = np.arange(len(b) + 1)
+    previous = steps.copy()
+    for i, char in enumerate(a, 1):
+        current = np.empty_like(previous)
+        current[0] = i
+        current[1:] = np.minimum(previous[1:] + 1, previous[:-1] + (b_codes != ord(char)))
+        # Insertions chain left to right: current[j] = min over k <= j of current[k] + (j - k).
+        previous = np.minimum.accumulate(current - steps) + steps
+    return int(previous[-1])
+
+
+def char_accuracy(reference: str, hypothesis: str) -> float:
+    reference, hypothesis = normalize(reference), normalize(hypothesis)
+    if not reference:
+        return 1.0 if not hypothesis else 0.0
+    return max(0.0, 1.0 - edit_distance(reference, hypothesis) / len(reference))
+
+
+def page_texts(document_data) -> dict:
+    text = document_data["text"]
+    return {page_no: text[start:end] for page_no, start, end in document_data.get("page_spans", [])}
+
+
+def host_description() -> str:
+    """CPU model and core count, stated next to the figures since they only hold for this kind of host."""
+    model = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            model = next(line.split(":", 1)[1].strip() for line in f if line.startswith("model name"))
+    except (OSError, StopIteration):
+        pass
+    return f"{model}, {os.cpu_count()} CPUs, Python {platform.python_version()}"
+
+
+def run_profile(name: str, corpus) -> dict:
+    from utlity.documnet_proesser import DocumentProcessor
+    from utlity.model_registry import pipeline_profile
+    from benchmarks.synthetic import reference_text
+
+    config = pipeline_profile(name)
+    processor = DocumentProcessor(pipeline_config=config, cache=None, workers=1)
+
+    start = time.perf_counter()
+    processor.registry.warm_up(config)
+    warm_up_seconds = time.perf_counter() - start
+
+    seconds = 0.0
+    pages = 0
+    accuracies = []
+    for path, contents in corpus:
+        start = time.perf_counter()
+        document_data = processor.extract_text_from_file(path)
+        seconds += time.perf_counter() - start
+        pages += document_data["page_count"]
+
+        texts = page_texts(document_data)
+        for page_no, (lines, table) in enumerate(contents, 1):
+            accuracies.append(char_accuracy(reference_text(lines, table), texts.get(page_no, "")))
+
+    return {
+        "profile": name,
+        "config": asdict(config),
+        "threads": config.threads(processor.registry.concurrency),
+        "warm_up_seconds": warm_up_seconds,
+        "pages": pages,
+        "seconds": seconds,
+        "pages_per_sec": pages / seconds if seconds else 0.0,
+        "char_accuracy": statistics.mean(accuracies) if accuracies else 0.0,
+        "char_accuracy_min": min(accuracies) if accuracies else 0.0,
+    }
+
+
+def main():
+    from utlity.model_registry import PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+    parser.add_argument("--pdfs", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--noise", type=float, default=0.0, help="salt-and-pepper noise fraction on the scans")
+    parser.add_argument("--output", default="ocr_profiles.json")
+    args = parser.parse_args()
+
+    from benchmarks.synthetic import make_scanned_pdf, scanned_pages
+
+    env_data.CACHE_DIR = tempfile.mkdtemp(prefix="bench_profiles_")
+    results = []
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus = []
+        for i in range(args.pdfs):
+            path = make_scanned_pdf(os.path.join(corpus_dir, f"scan_{i}.pdf"), args.pages, table_every=2, noise=args.noise, seed=i)
+            corpus.append((path, scanned_pages(args.pages, table_every=2, seed=i)))
+
+        for name in args.profiles:
+            results.append(run_profile(name, corpus))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "results": results,
+            "corpus": {"pdfs": args.pdfs, "pages": args.pages, "noise": args.noise},
+            "environment": {"host": host_description(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        }, f, indent=2)
+
+    print(f"Measured on {host_description()}; {args.pdfs} PDFs x {args.pages} pages, noise {args.noise}.\n")
+    print("| Profile | Pages/sec | Char accuracy (mean / min) | Warm-up (s) | Threads |")
+    print("| --- | --- | --- | --- | --- |")
+    for result in results:
+        print(f"| `{result['profile']}` | {result['pages_per_sec']:.2f} | "
+              f"{result['char_accuracy']:.3f} / {result['char_accuracy_min']:.3f} | "
+              f"{result['warm_up_seconds']:.1f} | {result['threads']} |")
+    print(f"\nresults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
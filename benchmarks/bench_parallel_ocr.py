@@ -0,0 +1,49 @@
+"""Measure page-parallel OCR against a single converter on a scanned PDF.
+
+    python -m benchmarks.bench_parallel_ocr --pages 50 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import make_scanned_pdf
+from utlity.documnet_proesser import DocumentProcessor
+from utlity.parallel_convert import get_pool, split_pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages-per-task", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = make_scanned_pdf(os.path.join(tmp_dir, "scan.pdf"), args.pages, table_every=5)
+
+        timings = {}
+        for workers in sorted({1, args.workers}):
+            processor = DocumentProcessor(cache=None, workers=workers, pages_per_task=args.pages_per_task)
+            if workers > 1:
+                # Warm the pool so the measurement excludes worker start-up and model loading.
+                pool = get_pool(processor.pipeline_config, workers)
+                list(pool.map(int, range(workers)))
+            else:
+                processor.registry.warm_up(processor.pipeline_config)
+
+            start = time.perf_counter()
+            metadata = processor.extract_text_from_file(pdf_path)
+            elapsed = time.perf_counter() - start
+            timings[workers] = elapsed
+
+            print(f"workers={workers:>2}: {metadata['page_count']} pages, {metadata.get('table_count', 0)} tables "
+                  f"in {elapsed:.1f}s -> {metadata['page_count'] / elapsed:.2f} pages/sec")
+
+        print(f"page ranges: {len(split_pages((1, args.pages), args.pages_per_task))}")
+        if args.workers > 1:
+            print(f"speedup: {timings[1] / timings[args.workers]:.2f}x on {os.cpu_count()} CPUs")
+
+
+if __name__ == "__main__":
+    main()
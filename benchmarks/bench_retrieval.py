@@ -0,0 +1,73 @@
+"""Recall@k and latency for vector-only, BM25-only and hybrid retrieval.
+
+Loads the labelled set in benchmarks/retrieval_eval.json into an in-process
+NumPy collection and runs every query in each mode. By default the real
+local embedding model is used; ``--hash-embeddings`` swaps in a
+deterministic hashing embedder that needs no model download (vector
+recall is then meaningless, but BM25 and the fusion plumbing are still
+exercised).
+
+    python -m benchmarks.bench_retrieval --k 3
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from utlity.env_load import env_data
+
+
+EVAL_PATH = os.path.join(os.path.dirname(__file__), "retrieval_eval.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--hash-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    env_data.VECTOR_BACKEND = "numpy"
+    env_data.CACHE_DIR = tempfile.mkdtemp(prefix="bench_retrieval_")
+
+    from utlity.chromadb import ChromaDBManager
+    embedder = None
+    if args.hash_embeddings:
+        from benchmarks.bench_chroma_ingest import HashEmbedder
+        embedder = HashEmbedder()
+
+    with open(EVAL_PATH, encoding="utf-8") as f:
+        eval_set = json.load(f)
+
+    manager = ChromaDBManager(collection_name=f"retrieval_eval_{int(time.time())}", embedder=embedder)
+    for document in eval_set["documents"]:
+        manager.add_document({
+            "filename": document["filename"],
+            "mime_type": "application/pdf",
+            "processing_method": "benchmark",
+            "timestamp": datetime.now().isoformat(),
+            "text": document["text"],
+            "tables": [{"table_id": i + 1, "csv_data": csv} for i, csv in enumerate(document.get("tables", []))],
+        })
+
+    print(f"{'mode':>8} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in ("vector", "bm25", "hybrid"):
+        hits = 0
+        latencies = []
+        for item in eval_set["queries"]:
+            query_embedding = manager.embedder.embed_query(item["query"])
+            start = time.perf_counter()
+            results = manager.search_documents(item["query"], n_results=args.k, query_embedding=query_embedding, mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            filenames = {metadata["filename"] for metadata in results["metadatas"][0]}
+            hits += bool(filenames & set(item["relevant"]))
+
+        latencies.sort()
+        print(f"{mode:>8} {hits / len(eval_set['queries']):>9.2f} {statistics.median(latencies):>8.2f} "
+              f"{latencies[int(0.95 * (len(latencies) - 1))]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Peak memory of PDF ingestion as the page count grows.
+
+Each page count is ingested in a fresh interpreter (so peak RSS belongs to
+that run alone) after the converter and embedding model are warmed up. With
+windowed streaming (the default) the growth above the warmed-up RSS should
+stay flat; ``--mode whole`` runs the one-shot conversion for comparison.
+Exits 1 when streamed peak growth at the largest page count exceeds the
+smallest by more than ``--tolerance`` plus ``--slack-mb``.
+
+    python -m benchmarks.bench_streaming_memory --pages 20 80 160
+    python -m benchmarks.bench_streaming_memory --mode whole --memory-mb 3072
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_pdf(path: str, pages: int, distinct: int = 8) -> str:
+    """A ``pages``-page scan built from ``distinct`` rendered pages, so generating it stays cheap."""
+    import pypdfium2 as pdfium
+    from benchmarks.synthetic import make_scanned_pdf
+
+    source_path = make_scanned_pdf(f"{path}.src.pdf", min(pages, distinct), table_every=2)
+    source = pdfium.PdfDocument(source_path)
+    pdf = pdfium.PdfDocument.new()
+    try:
+        while len(pdf) < pages:
+            count = min(len(source), pages - len(pdf))
+            pdf.import_pages(source, list(range(count)))
+        pdf.save(path)
+    finally:
+        pdf.close()
+        source.close()
+        os.remove(source_path)
+    return path
+
+
+def child(args):
+    from benchmarks.run_benchmarks import peak_rss_mb
+    from utlity.chromadb import ChromaDBManager
+    from utlity.documnet_proesser import DocumentProcessor, rss_mb
+    from utlity.llm import ingest_file
+
+    processor = DocumentProcessor(cache=None, workers=1)
+    manager = ChromaDBManager(collection_name=f"mem{int(time.time())}")
+    processor.registry.warm_up(processor.pipeline_config)
+    if processor.pipeline_config.skip_text_layer_pages:
+        processor.registry.warm_up(processor.pipeline_config.text_layer_variant())
+    manager.embedder.embed_documents(["warm up"])
+    baseline = rss_mb()
+
+    start = time.perf_counter()
+    doc_id, document_data = ingest_file(processor, manager, args.child)
+    print(json.dumps({
+        "pages": document_data["page_count"],
+        "streamed": document_data.get("streamed", False),
+        "seconds": time.perf_counter() - start,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def measure(path: str, args) -> dict:
+    env = dict(
+        os.environ,
+        VECTOR_BACKEND="numpy",
+        CACHE_DIR=tempfile.mkdtemp(prefix="bench_mem_"),
+        STREAM_MIN_PAGES="1" if args.mode == "stream" else "0",
+        CONVERSION_MEMORY_MB=str(args.memory_mb),
+        OCR_WORKERS="1",
+    )
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_streaming_memory", "--child", path],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 80, 160])
+    parser.add_argument("--mode", choices=["stream", "whole"], default="stream")
+    parser.add_argument("--memory-mb", type=int, default=0, help="CONVERSION_MEMORY_MB for the runs (0: no budget)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative growth of the peak")
+    parser.add_argument("--slack-mb", type=float, default=150.0, help="allowed absolute growth on top of --tolerance")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in sorted(args.pages):
+            path = make_pdf(os.path.join(directory, f"scan_{pages}.pdf"), pages)
+            result = measure(path, args)
+            result["growth_mb"] = result["peak_rss_mb"] - result["baseline_rss_mb"]
+            results.append(result)
+            print(f"{pages:>5} pages  {result['seconds']:>8.1f}s  baseline {result['baseline_rss_mb']:>7.0f} MB  "
+                  f"peak {result['peak_rss_mb']:>7.0f} MB  growth {result['growth_mb']:>7.0f} MB")
+
+    smallest, largest = results[0]["growth_mb"], results[-1]["growth_mb"]
+    limit = max(smallest, 0.0) * (1 + args.tolerance) + args.slack_mb
+    print(f"peak growth {smallest:.0f} MB -> {largest:.0f} MB (limit {limit:.0f} MB)")
+    if args.mode == "stream" and largest > limit:
+        print("peak memory grows with page count")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare the old CSV-in-text table ingestion with the Parquet table store.
+
+The old path cleaned a table column by column, printed it twice, serialised
+it to CSV and cut that into word-window ``TABLE:`` chunks. The new path
+cleans all text columns in one Arrow pass, writes Parquet and cuts whole-row
+chunks. Both are timed, and their peak Python allocations are measured with
+tracemalloc; embedding is left out since it depends on the model.
+
+    python -m benchmarks.bench_tables --rows 50000 --cols 12
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from utlity.chunker import iter_chunks
+from utlity.documnet_proesser import DocumentProcessor
+from utlity.env_load import env_data
+from utlity.table_store import TableStore, iter_table_chunks
+
+
+CELLS = ["  INV-{:05d} ", "${:,}.00", "Net\n30", "null", "paid", "over*due", "{} units", "café #{}", None]
+
+
+def make_table(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    data = [
+        [None if template is None else template.format(rng.randint(0, 99999)) for template in rng.choices(CELLS, k=cols)]
+        for _ in range(rows)
+    ]
+    return pd.DataFrame(data, columns=[f"col_{i}" for i in range(cols)], dtype=object)
+
+
+def legacy_clean(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.dropna(how='all').dropna(axis=1, how='all')
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].astype(str).str.strip()
+            df[col] = df[col].str.replace(r'\s+', ' ', regex=True)
+            df[col] = df[col].str.replace(r'[^\w\s\-\.,;:()/%$]', '', regex=True)
+            df[col] = df[col].replace(['nan', 'None', 'null'], '')
+    return df
+
+
+def legacy_ingest(df: pd.DataFrame) -> int:
+    cleaned = legacy_clean(df)
+    with contextlib.redirect_stdout(io.StringIO()):
+        print(df.to_string())
+        print(cleaned.to_string())
+    csv_data = cleaned.to_csv(index=False)
+    return sum(1 for _ in iter_chunks(csv_data, env_data.CHUNK_SIZE, env_data.CHUNK_OVERLAP, prefix="TABLE: "))
+
+
+def store_ingest(df: pd.DataFrame, store: TableStore) -> int:
+    cleaned = DocumentProcessor(cache=None).clean_table_data(df)
+    store.put("bench", 1, cleaned)
+    return sum(1 for _ in iter_table_chunks(cleaned, env_data.CHUNK_SIZE))
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--cols", type=int, default=10)
+    args = parser.parse_args()
+
+    df = make_table(args.rows, args.cols)
+    with tempfile.TemporaryDirectory() as root:
+        store = TableStore(root)
+        results = {
+            "csv text chunks": measure(legacy_ingest, df.copy()),
+            "parquet store": measure(store_ingest, df.copy(), store),
+        }
+        parquet_mb = os.path.getsize(os.path.join(root, "bench", "table_1.parquet")) / 2 ** 20
+
+    print(f"{args.rows} rows x {args.cols} columns")
+    print(f"{'path':>16} {'seconds':>8} {'peak MB':>8} {'chunks':>7}")
+    for name, (elapsed, peak, chunks) in results.items():
+        print(f"{name:>16} {elapsed:>8.2f} {peak:>8.1f} {chunks:>7}")
+    print(f"parquet file: {parquet_mb:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
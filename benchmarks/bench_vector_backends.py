@@ -0,0 +1,103 @@
+"""Latency and recall@k across the vector-store backends.
+
+Vectors are synthetic (clustered Gaussian, unit-normalised) so no embedding
+model is needed. Recall is measured against exact brute-force neighbours.
+HNSW parameters can be swept for the Chroma backends:
+
+    python -m benchmarks.bench_vector_backends --count 20000 --ef 10 50 100 --m 16 32
+    python -m benchmarks.bench_vector_backends --backends numpy memory cloud
+"""
+import argparse
+import itertools
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from utlity.env_load import env_data
+from utlity.vector_store import create_client, hnsw_metadata
+
+
+def make_vectors(count: int, dim: int, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, size=count)] + 0.3 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    scores = queries @ vectors.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+
+def run(backend: str, vectors, queries, truth, k: int, ef: int, m: int, batch_size: int) -> dict:
+    client = create_client(backend)
+    name = f"bench_{backend}_{ef}_{m}_{int(time.time() * 1000)}"
+    collection = client.get_or_create_collection(name=name, metadata=hnsw_metadata(ef=ef, m=m))
+
+    ids = [str(i) for i in range(len(vectors))]
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        collection.upsert(
+            ids=ids[i:i + batch_size],
+            embeddings=vectors[i:i + batch_size],
+            documents=ids[i:i + batch_size]
+        )
+    insert_seconds = time.perf_counter() - start
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=["distances"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(expected & {int(i) for i in result["ids"][0]})
+
+    client.delete_collection(name)
+    latencies.sort()
+    return {
+        "backend": backend,
+        "ef": ef,
+        "M": m,
+        "insert_per_sec": len(vectors) / insert_seconds,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "recall": hits / (k * len(queries)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["numpy", "memory", "persistent"])
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--ef", type=int, nargs="+", default=[env_data.HNSW_EF])
+    parser.add_argument("--m", type=int, nargs="+", default=[env_data.HNSW_M])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.count, args.dim)
+    queries = make_vectors(args.queries, args.dim, seed=1)
+    truth = exact_neighbours(vectors, queries, args.k)
+
+    persist_dir = tempfile.mkdtemp(prefix="bench_chroma_")
+    env_data.CHROMA_PATH = persist_dir
+    try:
+        print(f"{'backend':>10} {'ef':>5} {'M':>4} {'insert/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>9}")
+        for backend in args.backends:
+            # HNSW parameters only apply to the Chroma backends.
+            grid = [(args.ef[0], args.m[0])] if backend == "numpy" else itertools.product(args.ef, args.m)
+            for ef, m in grid:
+                row = run(backend, vectors, queries, truth, args.k, ef, m, args.batch_size)
+                print(f"{row['backend']:>10} {row['ef']:>5} {row['M']:>4} {row['insert_per_sec']:>10.0f} "
+                      f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['recall']:>9.3f}")
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Assert that importing the app and the utlity modules loads none of the heavy libraries.
+
+Each module is imported in a fresh interpreter and the check fails when
+Docling, OpenCV, LangChain, chromadb, torch... show up in sys.modules
+afterwards. Libraries Streamlit itself imports are allowed for ``main``,
+since the app can't start without Streamlit. Unlike
+benchmarks.bench_import_time nothing is timed, so the result doesn't
+depend on the machine. Exits 1 on any failure.
+
+    python -m benchmarks.check_lazy_imports
+"""
+import json
+import subprocess
+import sys
+
+from benchmarks.bench_import_time import ALLOWED_HEAVY, HEAVY_MODULES, ROOT, library_modules
+
+
+PROBE = """
+import json, sys
+import {module}
+print(json.dumps(sorted({{name.split(".")[0] for name in sys.modules}})))
+"""
+
+
+def imported(module: str) -> set:
+    completed = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return set(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+
+def main():
+    heavy = set(HEAVY_MODULES)
+    allowed = dict(ALLOWED_HEAVY, main=imported("streamlit") & heavy)
+
+    failures = 0
+    for module in ["main"] + library_modules():
+        try:
+            loaded = imported(module) & heavy - allowed.get(module, set())
+            assert not loaded, f"import {module} loaded {', '.join(sorted(loaded))}"
+            print(f"ok    {module}")
+        except (AssertionError, RuntimeError) as e:
+            failures += 1
+            print(f"FAIL  {module}: {e}")
+
+    if failures:
+        print(f"\n{failures} module(s) import heavy dependencies eagerly")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Offline check of conversion planning and streamed page windows.
+
+Runs without Docling or any model: page classification, page sizes and the
+converter are stubbed, so it can gate CI where benchmarks.bench_streaming_memory
+can't run. Checks that plan_conversion groups and splits page runs, that
+window_pages honours STREAM_WINDOW_PAGES and CONVERSION_MEMORY_MB, and that
+stream_text_from_file converts every page exactly once, in order, without a
+window crossing a run or exceeding its size. Exits 1 on any failure.
+
+    python -m benchmarks.check_streaming_windows
+"""
+import os
+import sys
+import tempfile
+import traceback
+from types import SimpleNamespace
+
+from utlity import documnet_proesser
+from utlity.documnet_proesser import DocumentProcessor
+from utlity.env_load import env_data
+from utlity.model_registry import PipelineConfig
+from utlity.page_classifier import PageInfo
+
+
+LETTER = (612.0, 792.0)
+
+
+class StubConverter:
+    """Returns one line of text and one table per page, recording every page range asked for."""
+
+    def __init__(self, config: PipelineConfig, calls: list):
+        self.config = config
+        self.calls = calls
+
+    def convert(self, source, page_range=None):
+        self.calls.append((page_range, self.config))
+        first, last = page_range
+        texts = [f"page {page_no}" for page_no in range(first, last + 1)]
+        spans, offset = [], 0
+        for page_no, text in zip(range(first, last + 1), texts):
+            spans.append((page_no, offset, offset + len(text)))
+            offset += len(text) + 1
+        return SimpleNamespace(document={
+            "text": "\n".join(texts),
+            "page_spans": spans,
+            "page_count": len(texts),
+            "tables": [{"table_id": i + 1, "page_no": page_no} for i, page_no in enumerate(range(first, last + 1))],
+            "images": [],
+        })
+
+
+class StubRegistry:
+    def __init__(self):
+        self.calls = []
+
+    def get_converter(self, config: PipelineConfig):
+        return StubConverter(config, self.calls)
+
+
+class StubProcessor(DocumentProcessor):
+    # The stub converter already returns a summary.
+    summarize_document = staticmethod(lambda document: document)
+
+
+def classified(needs_ocr: str):
+    """Page classification from a string like "TTOOOT" (T: text layer, O: needs OCR)."""
+    return [PageInfo(page_no, 100, 0.5, 0.0, flag == "O") for page_no, flag in enumerate(needs_ocr, 1)]
+
+
+def processor(pages: str, **kwargs) -> StubProcessor:
+    documnet_proesser.classify_pages = lambda filepath: classified(pages)
+    documnet_proesser.max_page_size = lambda filepath: LETTER
+    return StubProcessor(registry=StubRegistry(), pipeline_config=PipelineConfig(), cache=None, **kwargs)
+
+
+def check_plan():
+    config = PipelineConfig()
+    text_config = config.text_layer_variant()
+
+    runs = processor("TTOOOT", workers=1).plan_conversion("doc.pdf", "application/pdf")
+    assert runs == [((1, 2), text_config), ((3, 5), config), ((6, 6), text_config)], runs
+
+    tasks = processor("TTOOOT", workers=1, pages_per_task=2).plan_conversion("doc.pdf", "application/pdf", split=True)
+    assert tasks == [((1, 2), text_config), ((3, 4), config), ((5, 5), config), ((6, 6), text_config)], tasks
+
+    assert processor("OO").plan_conversion("photo.png", "image/png") == [(None, config)]
+
+
+def check_window_pages(saved_rss):
+    page_mb = DocumentProcessor.page_memory_mb(LETTER, PipelineConfig(images_scale=5.0))
+    assert abs(page_mb - 612 * 792 * 25 * 12 / 2 ** 20) < 1e-6, page_mb
+
+    env_data.STREAM_WINDOW_PAGES, env_data.CONVERSION_MEMORY_MB = 8, 0
+    assert DocumentProcessor.window_pages(page_mb) == 8
+
+    documnet_proesser.rss_mb = lambda: 1000.0
+    env_data.CONVERSION_MEMORY_MB = 1500
+    assert DocumentProcessor.window_pages(100.0) == 5
+    assert DocumentProcessor.window_pages(10.0) == 8
+    # Over budget already: still one page at a time, never zero.
+    env_data.CONVERSION_MEMORY_MB = 900
+    assert DocumentProcessor.window_pages(100.0) == 1
+    documnet_proesser.rss_mb = saved_rss
+
+
+def check_windows(path: str, pages: str, window: int, memory_mb: int = 0, rss=None):
+    env_data.STREAM_WINDOW_PAGES, env_data.CONVERSION_MEMORY_MB = window, memory_mb
+    if rss is not None:
+        documnet_proesser.rss_mb = rss
+    doc = processor(pages, workers=1)
+    progress = []
+    metadata, windows = doc.stream_text_from_file(path, progress=lambda done, total: progress.append((done, total)))
+    assert not doc.registry.calls, "converted before the first window was asked for"
+
+    windows = list(windows)
+    calls = doc.registry.calls
+    covered = [page_no for (first, last), _ in calls for page_no in range(first, last + 1)]
+    assert covered == list(range(1, len(pages) + 1)), covered
+    runs = doc.plan_conversion(path, "application/pdf", split=False)
+    for (first, last), config in calls:
+        assert last - first + 1 <= window, (first, last)
+        assert any(run_first <= first and last <= run_last and config == run_config
+                   for (run_first, run_last), run_config in runs), (first, last)
+
+    table_ids = [table["table_id"] for summary in windows for table in summary["tables"]]
+    assert table_ids == list(range(1, len(pages) + 1)), table_ids
+    assert metadata["page_count"] == metadata["table_count"] == len(pages)
+    assert metadata["word_count"] == 2 * len(pages)
+    assert progress[-1] == (len(pages), len(pages)), progress
+    return calls
+
+
+def check_budget_windows(path: str):
+    # 300 MB of headroom fits two letter pages at images_scale 5 (about 139 MB each).
+    calls = check_windows(path, "O" * 10, window=8, memory_mb=1300, rss=lambda: 1000.0)
+    ranges = [page_range for page_range, _ in calls]
+    assert ranges == [(page_no, page_no + 1) for page_no in range(1, 11, 2)], ranges
+
+
+def main():
+    saved = (documnet_proesser.classify_pages, documnet_proesser.max_page_size, documnet_proesser.rss_mb,
+             env_data.STREAM_WINDOW_PAGES, env_data.CONVERSION_MEMORY_MB)
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "doc.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4 stub")
+
+        checks = [
+            ("plan_conversion runs and splits", check_plan),
+            ("window_pages budget", lambda: check_window_pages(saved[2])),
+            ("windows cover every page once", lambda: check_windows(path, "O" * 20, window=8)),
+            ("windows stay inside runs", lambda: check_windows(path, "TTTOOOOOOOOOOTTO", window=4)),
+            ("windows shrink under a memory budget", lambda: check_budget_windows(path)),
+        ]
+        for name, check in checks:
+            try:
+                check()
+                print(f"ok    {name}")
+            except AssertionError:
+                failures += 1
+                print(f"FAIL  {name}")
+                traceback.print_exc()
+            finally:
+                (documnet_proesser.classify_pages, documnet_proesser.max_page_size, documnet_proesser.rss_mb,
+                 env_data.STREAM_WINDOW_PAGES, env_data.CONVERSION_MEMORY_MB) = saved
+
+    if failures:
+        print(f"\n{failures} check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
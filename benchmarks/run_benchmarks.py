@@ -0,0 +1,229 @@
+"""End-to-end benchmark: synthetic scans through OCR, ingestion and question answering.
+
+Everything runs offline: documents are generated (benchmarks/synthetic.py),
+vectors go to an in-process collection and answers come from
+FakeStreamingLLM. Results are written as JSON; pass a previous run with
+``--baseline`` to flag regressions.
+
+    python -m benchmarks.run_benchmarks --pdfs 3 --pages 5 --images 3 --output bench.json
+    python -m benchmarks.run_benchmarks --images-scale 2.0 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+
+from utlity.env_load import env_data
+
+
+# Metric name -> True when higher is better.
+TRACKED_METRICS = {
+    "warm_up_seconds": False,
+    "conversion_seconds": False,
+    "ingestion_seconds": False,
+    "pages_per_sec": True,
+    "chunks_per_sec": True,
+    "retrieval_p50_ms": False,
+    "retrieval_p95_ms": False,
+    "query_p50_ms": False,
+    "query_p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else 0.0
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_corpus(directory: str, pdfs: int, pages: int, images: int) -> list:
+    from benchmarks.synthetic import make_scanned_image, make_scanned_pdf
+
+    paths = []
+    for i in range(pdfs):
+        paths.append(make_scanned_pdf(os.path.join(directory, f"scan_{i}.pdf"), pages, table_every=2, seed=i))
+    for i in range(images):
+        paths.append(make_scanned_image(os.path.join(directory, f"photo_{i}.png"), with_table=i % 2 == 0, noise=0.01, seed=100 + i))
+    return paths
+
+
+def make_queries(count: int) -> list:
+    from benchmarks.synthetic import WORDS
+
+    templates = [
+        "What is the {} {} for the {}?",
+        "Summarize the {} and {} for each {}.",
+        "Which {} has the highest {} {}?",
+    ]
+    return [
+        templates[i % len(templates)].format(WORDS[i % len(WORDS)], WORDS[(3 * i + 1) % len(WORDS)], WORDS[(7 * i + 2) % len(WORDS)])
+        for i in range(count)
+    ]
+
+
+def run(args) -> dict:
+    from utlity.fake_llm import FakeStreamingLLM
+    from utlity.llm import DocumentQASystem
+    from utlity.model_registry import pipeline_profile
+
+    qa_system = DocumentQASystem(
+        "offline",
+        collection_name=f"bench{int(time.time())}",
+        llm=FakeStreamingLLM(first_token_delay=args.llm_first_token, token_delay=args.llm_token_delay)
+    )
+    processor = qa_system.processor
+    # Measure real conversions, never cache hits from an earlier run.
+    processor.cache = None
+    overrides = {"images_scale": args.images_scale, "table_mode": args.table_mode}
+    processor.pipeline_config = replace(
+        pipeline_profile(args.profile),
+        **{key: value for key, value in overrides.items() if value is not None}
+    )
+
+    start = time.perf_counter()
+    processor.registry.warm_up(processor.pipeline_config)
+    warm_up_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = make_corpus(corpus_dir, args.pdfs, args.pages, args.images)
+
+        conversion_seconds = 0.0
+        ingestion_seconds = 0.0
+        pages = 0
+        documents = []
+        for path in paths:
+            start = time.perf_counter()
+            document_data = processor.extract_text_from_file(path)
+            elapsed = time.perf_counter() - start
+            conversion_seconds += elapsed
+            pages += document_data["page_count"]
+
+            start = time.perf_counter()
+            qa_system.db_manager.add_document(document_data)
+            ingestion_seconds += time.perf_counter() - start
+
+            documents.append({
+                "file": os.path.basename(path),
+                "pages": document_data["page_count"],
+                "ocr_pages": document_data.get("ocr_pages"),
+                "tables": document_data.get("table_count", 0),
+                "words": document_data["word_count"],
+                "conversion_seconds": round(elapsed, 3),
+            })
+
+    chunks = qa_system.get_system_stats()["total_chunks"]
+
+    retrieval_ms = []
+    query_ms = []
+    for question in make_queries(args.queries):
+        start = time.perf_counter()
+        qa_system.prepare_answer(question)
+        retrieval_ms.append((time.perf_counter() - start) * 1000)
+
+        # A fresh cache per question so every measurement includes generation.
+        qa_system.answer_cache.max_entries = 0
+        start = time.perf_counter()
+        qa_system.answer_question(question)
+        query_ms.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "documents": documents,
+        "metrics": {
+            "warm_up_seconds": warm_up_seconds,
+            "conversion_seconds": conversion_seconds,
+            "ingestion_seconds": ingestion_seconds,
+            "pages": pages,
+            "chunks": chunks,
+            "pages_per_sec": pages / conversion_seconds if conversion_seconds else 0.0,
+            "chunks_per_sec": chunks / ingestion_seconds if ingestion_seconds else 0.0,
+            "retrieval_p50_ms": statistics.median(retrieval_ms) if retrieval_ms else 0.0,
+            "retrieval_p95_ms": percentile(retrieval_ms, 0.95),
+            "query_p50_ms": statistics.median(query_ms) if query_ms else 0.0,
+            "query_p95_ms": percentile(query_ms, 0.95),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for name, higher_is_better in TRACKED_METRICS.items():
+        old = baseline["metrics"].get(name)
+        new = current["metrics"].get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = change < -threshold if higher_is_better else change > threshold
+        marker = "REGRESSION" if regressed else ""
+        print(f"{name:>20}: {old:>10.2f} -> {new:>10.2f} ({change:+.1%}) {marker}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdfs", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--profile", default=env_data.OCR_PROFILE, help="OCR profile the overrides below start from")
+    parser.add_argument("--images-scale", type=float, help="default: the profile's")
+    parser.add_argument("--table-mode", choices=["accurate", "fast"], help="default: the profile's")
+    parser.add_argument("--chunk-size", type=int, default=env_data.CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=env_data.CHUNK_OVERLAP)
+    parser.add_argument("--backend", choices=["numpy", "memory"], default="numpy")
+    parser.add_argument("--llm-first-token", type=float, default=0.05)
+    parser.add_argument("--llm-token-delay", type=float, default=0.002)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    # Offline settings; must be set before the utlity modules create their clients and indexes.
+    env_data.VECTOR_BACKEND = args.backend
+    env_data.CACHE_DIR = tempfile.mkdtemp(prefix="bench_cache_")
+    env_data.CHUNK_SIZE = args.chunk_size
+    env_data.CHUNK_OVERLAP = args.chunk_overlap
+
+    result = run(args)
+    result["config"] = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    result["environment"] = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    for name, value in result["metrics"].items():
+        print(f"{name:>20}: {value:.2f}")
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {args.baseline}:")
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Synthetic scanned documents for the benchmarks.
+
+Pages are rendered with PIL and saved as image-only PDFs, so every page has
+to go through OCR exactly like a real scan.
+"""
+import random
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+PAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+WORDS = (
+    "invoice amount total customer account payment balance order shipment "
+    "quantity price tax discount contract service period report summary "
+    "revenue expense quarter annual region product delivery reference"
+).split()
+
+
+def page_lines(rng: random.Random, line_count: int = 40, words_per_line: int = 10) -> List[str]:
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_line)) for _ in range(line_count)]
+
+
+def render_page(lines: List[str], table_rows: List[List[str]] = None, noise: float = 0.0, seed: int = 0) -> Image.Image:
+    image = Image.new("L", PAGE_SIZE, color=255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    y = 80
+    for line in lines:
+        draw.text((80, y), line, fill=0, font=font)
+        y += 28
+
+    if table_rows:
+        y += 20
+        col_width = (PAGE_SIZE[0] - 160) // len(table_rows[0])
+        for row in table_rows:
+            for c, cell in enumerate(row):
+                x = 80 + c * col_width
+                draw.rectangle([x, y, x + col_width, y + 32], outline=0)
+                draw.text((x + 8, y + 8), cell, fill=0, font=font)
+            y += 32
+
+    if noise:
+        rng = random.Random(seed)
+        pixels = image.load()
+        for _ in range(int(PAGE_SIZE[0] * PAGE_SIZE[1] * noise)):
+            pixels[rng.randrange(PAGE_SIZE[0]), rng.randrange(PAGE_SIZE[1])] = rng.choice((0, 255))
+
+    return image
+
+
+def make_table(rng: random.Random, rows: int = 8) -> List[List[str]]:
+    header = ["Invoice", "Customer", "Amount", "Status"]
+    body = [
+        [f"INV-{rng.randint(1000, 9999)}", rng.choice(WORDS).title(), f"{rng.uniform(10, 5000):.2f}", rng.choice(["paid", "open"])]
+        for _ in range(rows)
+    ]
+    return [header] + body
+
+
+def scanned_pages(pages: int, table_every: int = 0, seed: int = 0) -> List[Tuple[List[str], List[List[str]]]]:
+    """The (lines, table_rows) printed on each page of make_scanned_pdf with the same arguments."""
+    rng = random.Random(seed)
+    contents = []
+    for page in range(pages):
+        table = make_table(rng) if table_every and page % table_every == 0 else None
+        contents.append((page_lines(rng), table))
+    return contents
+
+
+def reference_text(lines: List[str], table_rows: List[List[str]] = None) -> str:
+    """Ground truth for a rendered page: its lines, then the table cells row by row."""
+    return " ".join(lines + [cell for row in table_rows or [] for cell in row])
+
+
+def make_scanned_pdf(path: str, pages: int, table_every: int = 0, noise: float = 0.0, seed: int = 0) -> str:
+    images = []
+    for page, (lines, table) in enumerate(scanned_pages(pages, table_every, seed)):
+        images.append(render_page(lines, table, noise=noise, seed=seed + page).convert("RGB"))
+
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=150)
+    return path
+
+
+def make_scanned_image(path: str, with_table: bool = False, noise: float = 0.0, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    table = make_table(rng) if with_table else None
+    render_page(page_lines(rng), table, noise=noise, seed=seed).save(path)
+    return path
@@ -1,13 +1,86 @@
 import streamlit as st
 import os
 from utlity.llm import DocumentQASystem
-import tempfile
 from utlity.env_load import env_data
-from uuid import uuid4
+from utlity.model_registry import PROFILES, model_registry
+from utlity.tracing import tracer
+from utlity.ingest_jobs import IngestRunner, get_job_queue, DONE, FAILED, RUNNING
+from utlity.collection_pool import get_collection_pool
+from uuid import UUID, uuid4
 
 os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
 
 
+@st.cache_resource
+def warm_up_models():
+    # Runs once per process; every session shares the loaded converter.
+    # Sized for the ingestion threads that will share it, since converters are cached with their thread count.
+    model_registry.concurrency = env_data.INGEST_CONCURRENCY
+    model_registry.warm_up()
+    return model_registry
+
+
+@st.cache_resource
+def start_ingest_runner():
+    # One set of ingestion threads per server process, shared by every browser session.
+    return IngestRunner(get_job_queue()).start()
+
+
+@st.cache_resource
+def start_collection_reaper():
+    # Sessions that stop coming back lose their collection (and job history) after SESSION_TTL_SECONDS.
+    pool = get_collection_pool()
+    pool.on_drop.append(get_job_queue().clear)
+    return pool.start_reaper()
+
+
+@st.fragment(run_every=2)
+def ingestion_jobs(job_queue, session_id):
+    jobs = job_queue.jobs(session_id)
+    if not jobs:
+        return
+
+    st.subheader("Ingestion Jobs")
+    for job in jobs:
+        if job.status == RUNNING:
+            fraction = job.pages_done / job.pages_total if job.pages_total else 0.0
+            eta = job.eta()
+            label = f"{job.filename}: page {job.pages_done}/{job.pages_total or '?'}"
+            st.progress(fraction, text=label + (f" · ~{eta:.0f}s left" if eta is not None else ""))
+        elif job.status == DONE:
+            with st.expander(f"✅ {job.filename}"):
+                details = job.details()
+                st.write(f"**Word Count:** {details.get('word_count', 0)}")
+                st.write(f"**Pages:** {details.get('page_count', 1)}")
+                st.write(f"**OCR Pages:** {details.get('ocr_pages', 0)} (text layer: {details.get('text_layer_pages', 0)})")
+                st.write(f"**Has Tables:** {'Yes' if details.get('has_tables') else 'No'}")
+                st.write(f"**Has Images:** {'Yes' if details.get('has_images') else 'No'}")
+                st.write(f"**Processing Method:** {details.get('processing_method', 'Unknown')}")
+                st.write(f"**OCR Profile:** {job.profile or env_data.OCR_PROFILE}")
+                if job.finished_at and job.started_at:
+                    st.write(f"**Time:** {job.finished_at - job.started_at:.1f}s")
+        elif job.status == FAILED:
+            st.error(f"❌ {job.filename}: {job.error}")
+        else:
+            st.write(f"⏳ {job.filename} (queued)")
+
+    # Rerun the whole page once the last job finishes, so stats and chat catch up.
+    active = any(job.active for job in jobs)
+    if st.session_state.get("jobs_active") and not active:
+        st.session_state["jobs_active"] = False
+        st.rerun()
+    st.session_state["jobs_active"] = active
+
+
+def session_from_url():
+    # The id names the session's collection and its files under CACHE_DIR, so anything but a uuid gets a fresh session.
+    value = st.query_params.get("session")
+    try:
+        return str(UUID(value)) if value else None
+    except ValueError:
+        return None
+
+
 def main():
     st.set_page_config(
         page_title="Document QA System with Docling",
@@ -17,14 +90,27 @@ def main():
     
     st.title("📄 Document QA System")
     st.markdown("Upload documents and ask questions")
+
+    if env_data.OCR_WARMUP:
+        with st.spinner("Loading OCR models..."):
+            warm_up_models()
+
+    start_ingest_runner()
+    collection_pool = start_collection_reaper()
+    job_queue = get_job_queue()
     
 
     
     # Sidebar for configuration
     with st.sidebar:
-        if st.button("Clear"):
-            st.session_state.qa_system.clear_system(f"col{st.session_state.session_id}")
-            st.session_state.clear()
+        if st.button("Clear") and st.session_state.get("qa_system"):
+            try:
+                # Also forgets the session's ingestion jobs, through the pool's on_drop hook.
+                st.session_state.qa_system.clear_system(f"col{st.session_state.session_id}")
+                st.session_state.clear()
+                del st.query_params["session"]
+            except Exception as e:
+                st.error(f"Could not clear the collection: {e}")
             
 
         if "qa_system" not in st.session_state:
@@ -34,10 +120,12 @@ def main():
 
         
         if "session_id" not in st.session_state:
-            st.session_state.session_id = str(uuid4())
-        api_key = env_data.GOOGLE_API_KEY
-        system_inti = DocumentQASystem(api_key, collection_name=st.session_state.session_id)
-        st.session_state.qa_system = system_inti
+            # Kept in the URL so a refresh reattaches to the same collection and ingestion jobs.
+            st.session_state.session_id = session_from_url() or str(uuid4())
+            st.query_params["session"] = st.session_state.session_id
+        if st.session_state.qa_system is None:
+            api_key = env_data.GOOGLE_API_KEY
+            st.session_state.qa_system = DocumentQASystem(api_key, collection_name=st.session_state.session_id)
         
         st.divider()
         
@@ -58,6 +146,28 @@ def main():
                 st.write("**File Types:**")
                 for file_type, count in stats["file_types"].items():
                     st.write(f"• {file_type}: {count}")
+
+            with st.expander("Answer Cache"):
+                for name, count in st.session_state.qa_system.get_cache_stats().items():
+                    st.write(f"• {name}: {count}")
+
+            with st.expander("Vector Store"):
+                for name, value in collection_pool.stats().items():
+                    st.write(f"• {name}: {value}")
+
+            with st.expander("Model Loads"):
+                for name, count in st.session_state.qa_system.get_model_stats().items():
+                    st.write(f"• {name}: {count}")
+
+            if tracer.enabled:
+                with st.expander("Stage Timings"):
+                    for upload in st.session_state.qa_system.get_timing_breakdowns():
+                        st.write(f"**{upload['filename']}** ({upload['total']:.2f}s)")
+                        for stage, seconds in sorted(upload["stages"].items(), key=lambda item: -item[1]):
+                            st.write(f"• {stage}: {seconds:.3f}s")
+                    st.download_button(
+                        "Prometheus metrics", tracer.prometheus_text() + collection_pool.prometheus_text(), file_name="metrics.prom"
+                    )
                     
             
         st.divider()
@@ -71,32 +181,26 @@ def main():
         )
         
         if uploaded_files and st.session_state.qa_system:
-            for uploaded_file in uploaded_files:
-                if st.button(f"Process {uploaded_file.name}", key=f"process_{uploaded_file.name}"):
-                    with st.spinner(f"Processing {uploaded_file.name} with Docling..."):
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
-                            tmp_file.write(uploaded_file.getvalue())
-                            tmp_path = tmp_file.name
-                        
-                        try:    
-                            result = st.session_state.qa_system.process_and_store_document(tmp_path)
-                            
-                            if result["success"]:
-                                st.success(f"✅ {uploaded_file.name} processed successfully!")
-                                
-                                # Show processing details
-                                with st.expander("Processing Details"):
-                                    metadata = result["metadata"]
-                                    st.write(f"**Word Count:** {metadata.get('word_count', 0)}")
-                                    st.write(f"**Pages:** {metadata.get('page_count', 1)}")
-                                    st.write(f"**Has Tables:** {'Yes' if metadata.get('has_tables') else 'No'}")
-                                    st.write(f"**Has Images:** {'Yes' if metadata.get('has_images') else 'No'}")
-                                    st.write(f"**Processing Method:** {metadata.get('processing_method', 'Unknown')}")
-                            else:
-                                st.error(f"❌ Error processing {uploaded_file.name}: {result['error']}")
-                        
-                        finally:
-                            os.unlink(tmp_path)
+            profiles = list(PROFILES)
+            profile = st.selectbox(
+                "OCR profile", profiles, index=profiles.index(env_data.OCR_PROFILE),
+                help="fast: mobile recognizer, fast tables, 2x scale · accurate: server recognizer, 5x scale"
+            )
+            if st.button(f"Process all ({len(uploaded_files)})", key="process_all"):
+                for uploaded_file in uploaded_files:
+                    job, created = job_queue.submit(
+                        st.session_state.session_id,
+                        f"col{st.session_state.session_id}",
+                        uploaded_file.name,
+                        uploaded_file.getvalue(),
+                        profile=None if profile == env_data.OCR_PROFILE else profile
+                    )
+                    if created:
+                        st.session_state["jobs_active"] = True
+                    else:
+                        st.info(f"{uploaded_file.name} was already submitted ({job.status})")
+
+        ingestion_jobs(job_queue, st.session_state.session_id)
     
 
     if st.session_state.qa_system:
@@ -114,6 +218,9 @@ def main():
                             col1, col2 = st.columns([3, 1])
                             with col1:
                                 st.write(f"📄 **{source['filename']}**")
+                                if source.get('pages'):
+                                    first_page, last_page = source['pages']
+                                    st.write(f"   Page {first_page}" if first_page == last_page else f"   Pages {first_page}-{last_page}")
                                 features = []
                                 if source.get('has_tables'):
                                     features.append("Tables")
@@ -126,21 +233,7 @@ def main():
                                     st.metric("Relevance", f"{source['relevance_score']:.2f}")
         
 
-        processing = False
-        if uploaded_files and st.session_state.qa_system:
-            for uploaded_file in uploaded_files:
-                if st.session_state.get(f"processing_{uploaded_file.name}", False):
-                    processing = True
-                    break
-
-
-        if 'doc_processing' not in st.session_state:
-            st.session_state['doc_processing'] = False
-
-
-        st.session_state['doc_processing'] = processing
-
-        chat_disabled = st.session_state['doc_processing']
+        chat_disabled = job_queue.active_count(st.session_state.session_id) > 0
 
         prompt = st.chat_input("Ask a question about your documents...", disabled=chat_disabled)
         if chat_disabled:
@@ -153,9 +246,18 @@ def main():
                 st.markdown(prompt)
 
             with st.chat_message("assistant"):
-                with st.spinner("Analyzing documents and generating answer..."):
-                    response = st.session_state.qa_system.answer_question(prompt)
-                st.markdown(response["answer"])
+                with st.spinner("Searching documents..."):
+                    response = st.session_state.qa_system.stream_answer(prompt)
+                # Tokens render as they arrive; "answer" and "metrics" are set once the stream ends.
+                st.write_stream(response["stream"])
+                if response.get("cached"):
+                    st.caption("⚡ Answered from cache")
+                elif response.get("metrics", {}).get("time_to_first_token") is not None:
+                    metrics = response["metrics"]
+                    st.caption(f"First token {metrics['time_to_first_token']:.2f}s · total {metrics['total_time']:.2f}s")
+                if response.get("context_stats"):
+                    context_stats = response["context_stats"]
+                    st.caption(f"Context {context_stats['context_tokens']} tokens · {context_stats['tokens_saved']} saved")
 
                 if response.get("confidence", 0) > 0:
                     confidence_color = "green" if response["confidence"] > 0.7 else "orange" if response["confidence"] > 0.4 else "red"
@@ -0,0 +1,88 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+class AnswerCache:
+    """LRU/TTL cache of answers keyed by collection content version and question.
+
+    Exact repeats are a dict lookup; near-duplicates match when the cosine
+    similarity of the question embeddings reaches ``similarity_threshold``.
+    Every entry belongs to one content version, so any change to the
+    collection invalidates the whole cache.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self.counters = {"hits": 0, "near_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _sync_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.counters["invalidations"] += 1
+            self._entries.clear()
+            self._version = version
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+            self.counters["evictions"] += 1
+
+    def _nearest(self, vector: np.ndarray) -> Optional[str]:
+        if not self._entries or vector is None:
+            return None
+        keys = list(self._entries)
+        matrix = np.stack([self._entries[key]["vector"] for key in keys])
+        query = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ query / np.maximum(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity_threshold else None
+
+    def get(self, version, question: str, vector: np.ndarray = None) -> Optional[Dict[str, Any]]:
+        key = normalize_question(question)
+        with self._lock:
+            self._sync_version(version)
+            self._expire(time.monotonic())
+
+            if key in self._entries:
+                self.counters["hits"] += 1
+            else:
+                key = self._nearest(vector)
+                if key is None:
+                    self.counters["misses"] += 1
+                    return None
+                self.counters["near_hits"] += 1
+
+            self._entries.move_to_end(key)
+            return copy.deepcopy(self._entries[key]["response"])
+
+    def put(self, version, question: str, vector: np.ndarray, response: Dict[str, Any]):
+        key = normalize_question(question)
+        with self._lock:
+            self._sync_version(version)
+            self._entries[key] = {
+                "response": copy.deepcopy(response),
+                "vector": np.asarray(vector, dtype=np.float32),
+                "created": time.monotonic()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries))
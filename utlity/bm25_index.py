@@ -0,0 +1,199 @@
+from array import array
+from typing import Dict, Iterable, List, Sequence, Tuple
+import math
+import os
+import pickle
+import re
+import threading
+import numpy as np
+from utlity.env_load import env_data
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; compound identifiers (INV-2023-0042, 12.50) also yield their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-_./]", token) if part)
+    return tokens
+
+
+def is_keyword_query(query: str) -> bool:
+    # Short queries made of identifiers or numbers gain nothing from semantic search.
+    words = query.split()
+    return 0 < len(words) <= 3 and all(any(c.isdigit() for c in word) for word in words)
+
+
+class BM25Index:
+    """Incremental BM25 inverted index with array-backed postings.
+
+    Each term maps to two parallel ``array('I')`` postings lists (document
+    number, term frequency). Re-indexed or deleted chunks are tombstoned and
+    skipped at query time, so adds never rewrite existing postings.
+    """
+
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+        if path:
+            self._load()
+
+    def _reset(self):
+        self.terms: Dict[str, int] = {}
+        self.postings_docs: List[array] = []
+        self.postings_tfs: List[array] = []
+        self.chunk_ids: List[str] = []
+        self.parents: List[str] = []
+        self.lengths = array("I")
+        self.alive = array("B")
+        self.positions: Dict[str, int] = {}
+        self.live_count = 0
+        self.total_length = 0
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            state = {key: value for key, value in self.__dict__.items() if key not in ("_lock", "path")}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def _tombstone(self, position: int):
+        if self.alive[position]:
+            self.alive[position] = 0
+            self.live_count -= 1
+            self.total_length -= self.lengths[position]
+
+    def add(self, chunk_ids: Sequence[str], texts: Sequence[str], parent_doc_ids: Sequence[str]):
+        with self._lock:
+            for chunk_id, text, parent_doc_id in zip(chunk_ids, texts, parent_doc_ids):
+                if chunk_id in self.positions:
+                    self._tombstone(self.positions[chunk_id])
+
+                position = len(self.chunk_ids)
+                self.positions[chunk_id] = position
+                self.chunk_ids.append(chunk_id)
+                self.parents.append(parent_doc_id)
+
+                frequencies = {}
+                tokens = tokenize(text)
+                for token in tokens:
+                    frequencies[token] = frequencies.get(token, 0) + 1
+
+                for token, tf in frequencies.items():
+                    term_id = self.terms.get(token)
+                    if term_id is None:
+                        term_id = self.terms[token] = len(self.postings_docs)
+                        self.postings_docs.append(array("I"))
+                        self.postings_tfs.append(array("I"))
+                    self.postings_docs[term_id].append(position)
+                    self.postings_tfs[term_id].append(tf)
+
+                self.lengths.append(len(tokens))
+                self.alive.append(1)
+                self.live_count += 1
+                self.total_length += len(tokens)
+
+    def remove_parent(self, parent_doc_id: str):
+        with self._lock:
+            for position, parent in enumerate(self.parents):
+                if parent == parent_doc_id:
+                    self._tombstone(position)
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[str, float]]:
+        with self._lock:
+            if not self.live_count:
+                return []
+
+            lengths = np.frombuffer(self.lengths, dtype=np.uint32).astype(np.float32)
+            alive = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+            average_length = self.total_length / self.live_count
+            norm = self.k1 * (1 - self.b + self.b * lengths / max(average_length, 1e-9))
+            scores = np.zeros(len(self.chunk_ids), dtype=np.float32)
+
+            for token in set(tokenize(query)):
+                term_id = self.terms.get(token)
+                if term_id is None:
+                    continue
+                docs = np.frombuffer(self.postings_docs[term_id], dtype=np.uint32)
+                tfs = np.frombuffer(self.postings_tfs[term_id], dtype=np.uint32).astype(np.float32)
+                live = alive[docs]
+                document_frequency = int(live.sum())
+                if not document_frequency:
+                    continue
+                idf = math.log(1 + (self.live_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                # Postings are append-only and a document appears once per term, so plain indexing is safe.
+                scores[docs[live]] += idf * tfs[live] * (self.k1 + 1) / (tfs[live] + norm[docs[live]])
+
+            candidates = np.flatnonzero(scores > 0)
+            if not len(candidates):
+                return []
+            top = candidates[np.argsort(-scores[candidates], kind="stable")[:n_results]]
+            return [(self.chunk_ids[i], float(scores[i])) for i in top]
+
+    def rebuild(self, rows: Iterable[Tuple[str, str, str]]):
+        """Rebuild from (chunk_id, text, parent_doc_id) rows, e.g. a scan of the collection."""
+        with self._lock:
+            self._reset()
+            for chunk_id, text, parent_doc_id in rows:
+                self.add([chunk_id], [text], [parent_doc_id])
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self.save()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+# Collection names become file and directory names under CACHE_DIR, so only one plain path component is accepted.
+COLLECTION_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def check_collection_name(collection_name: str) -> str:
+    if not isinstance(collection_name, str) or not COLLECTION_NAME.match(collection_name):
+        raise ValueError(f"Invalid collection name {collection_name!r}: use letters, digits, '_' and '-' only")
+    return collection_name
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bm25_index(collection_name: str) -> BM25Index:
+    check_collection_name(collection_name)
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None:
+            index = BM25Index(os.path.join(env_data.CACHE_DIR, "bm25", f"{collection_name}.pkl"))
+            _indexes[collection_name] = index
+        return index
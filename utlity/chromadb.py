@@ -1,114 +1,456 @@
-import chromadb
-from chromadb.config import Settings
-import uuid
-from typing import Dict, Any, List
+import hashlib
+import queue
+import threading
+import time
+from typing import Dict, Any, Iterator, List
 from utlity.env_load import env_data
+from utlity.chunker import iter_chunks, split_text, approx_token_count
+from utlity.embeddings import EmbeddingEngine
+from utlity.collection_pool import CollectionPool, get_collection_pool
+from utlity.doc_stats import get_stats_index
+from utlity.bm25_index import get_bm25_index, is_keyword_query, reciprocal_rank_fusion
+from utlity.tracing import tracer
+from utlity.table_store import get_table_store, iter_table_chunks, table_digest_bytes, table_frame
+from utlity.parallel_convert import PAGE_DELIMITER
+import numpy as np
 
 
+def get_client():
+    """Return the process-wide vector-store client for VECTOR_BACKEND, connecting on first use."""
+    return get_collection_pool().client
+
+
+class BatchUploader:
+    """Upserts batches on a background thread, fed through a bounded queue."""
+
+    _DONE = object()
+
+    def __init__(self, collection, queue_size: int = 4):
+        self.collection = collection
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.error = None
+        self.uploaded = 0
+        self.upload_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.queue.put(self._DONE)
+        self._thread.join()
+        if exc_type is None and self.error is not None:
+            raise self.error
+        return False
+
+    def put(self, batch: Dict[str, list]):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(batch)
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is self._DONE:
+                return
+            if self.error is not None:
+                # Keep draining so the producer never blocks on a full queue.
+                continue
+            try:
+                start = time.perf_counter()
+                self.collection.upsert(**batch)
+                self.upload_seconds += time.perf_counter() - start
+                self.uploaded += len(batch["ids"])
+            except Exception as e:
+                self.error = e
+
 
 class ChromaDBManager:
 
     
-    def __init__(self, collection_name: str = "documents"):
-        self.client = chromadb.CloudClient(
-                    api_key=env_data.CHROMA_API_KEY,
-                    tenant=env_data.CHROMA_TENANT,
-                    database=env_data.CHROMA_DATABASE
-                    )
+    def __init__(self, collection_name: str = "documents", client=None, embedder: EmbeddingEngine = None,
+                 pool: CollectionPool = None):
+        # An explicit client gets a pool of its own; otherwise handles are shared process-wide.
+        if pool is None:
+            pool = CollectionPool(client=client) if client is not None else get_collection_pool()
+        self.pool = pool
+        self.client = pool.client
+        self.embedder = embedder if embedder is not None else EmbeddingEngine()
 
+        # The session's namespace: its own collection, or its slice of the shared one.
         self.collection_name = collection_name
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
+        self._max_batch_size = None
+        self._collection = None
+
+        self.stats_index = get_stats_index(collection_name)
+        self.keyword_index = get_bm25_index(collection_name)
+        # Counted once: in shared mode count() scans every id in the namespace.
+        chunk_count = self.collection.count()
+        if self.stats_index.total_chunks != chunk_count:
+            # The sidecar is out of step (e.g. an in-memory backend restarted); rebuild it once.
+            self.stats_index.rebuild(self.collection)
+        if len(self.keyword_index) != chunk_count:
+            self.rebuild_keyword_index()
+
+        self.table_store = get_table_store(collection_name)
+
+    @property
+    def collection(self):
+        # Resolved through the pool on every use, which also records the namespace as in use;
+        # a namespace the reaper dropped comes back empty instead of as a dead handle.
+        return self._collection if self._collection is not None else self.pool.collection(self.collection_name)
+
+    @collection.setter
+    def collection(self, collection):
+        self._collection = collection
     
-    def add_document(self, document_data: Dict) -> str:
-        doc_id = str(uuid.uuid4())
+    def add_document(self, document_data: Dict, batch_size: int = None) -> str:
+        with tracer.span("store.add_document", filename=document_data.get("filename")) as span:
+            doc_id = self.document_id(document_data)
+            batch_size = self.resolve_batch_size(batch_size)
+            self.remove_previous_version(doc_id)
 
-        chunks = self.split_text(document_data["text"])
-        
-        if "tables" in document_data:
-            for table in document_data["tables"]:
-                table_chunks = self.split_text(table["csv_data"], prefix="TABLE: ")
-                chunks.extend(table_chunks)
-        
-        for i, chunk in enumerate(chunks):
-            chunk_id = f"{doc_id}_{i}"
-            metadata = {
-                "filename": document_data["filename"],
-                "mime_type": document_data["mime_type"],
-                "processing_method": document_data["processing_method"],
-                "timestamp": document_data["timestamp"],
-                "chunk_index": i,
-                "parent_doc_id": doc_id,
-                "page_count": document_data.get("page_count", 1),
-                "has_tables": document_data.get("has_tables", False),
-                "has_images": document_data.get("has_images", False)
-            }
-            
-            self.collection.add(
-                documents=[chunk],
-                metadatas=[metadata],
-                ids=[chunk_id]
-            )
-        
-        return doc_id
+            try:
+                with tracer.span("store.tables", tables=len(document_data.get("tables", []))):
+                    frames = self.store_tables(doc_id, document_data)
+
+                chunk_count = self.upload(doc_id, document_data, self.iter_batches(doc_id, document_data, batch_size, frames))
+            except Exception:
+                # Don't leave keyword-index entries or tables behind for chunks that were never stored.
+                self.delete_document(doc_id)
+                raise
+            span.set(chunks=chunk_count)
+            return doc_id
+
+    def add_document_stream(self, document_data: Dict, windows: Iterator[Dict], batch_size: int = None) -> str:
+        """Ingest a document from DocumentProcessor.stream_text_from_file as its page windows arrive.
+
+        Each window is chunked, embedded and queued for upload before the next one
+        is converted; a failure part-way removes what was already stored.
+        """
+        with tracer.span("store.add_document", filename=document_data.get("filename"), streamed=True) as span:
+            doc_id = self.document_id(document_data)
+            batch_size = self.resolve_batch_size(batch_size)
+            self.remove_previous_version(doc_id)
+            chunks = self.iter_window_chunks(doc_id, document_data, windows)
+            try:
+                chunk_count = self.upload(doc_id, document_data, self.iter_batches(doc_id, document_data, batch_size, chunks=chunks))
+            except Exception:
+                self.delete_document(doc_id)
+                raise
+            span.set(chunks=chunk_count)
+            return doc_id
+
+    def remove_previous_version(self, doc_id: str):
+        """Drop an earlier ingest of the same content before storing it again.
+
+        Chunk ids are ``{doc_id}_{i}``, so upserting alone would leave the old
+        chunks past the new count (e.g. after CHUNK_SIZE changed) in the store.
+        """
+        if doc_id in self.stats_index:
+            with tracer.span("store.remove_previous"):
+                self.delete_document(doc_id)
+
+    def upload(self, doc_id: str, document_data: Dict, batches: Iterator[Dict[str, list]]) -> int:
+        chunk_count = 0
+        # Batches are uploaded from a background thread while the next ones are chunked.
+        with BatchUploader(self.collection, queue_size=env_data.CHROMA_UPLOAD_QUEUE) as uploader:
+            for batch in batches:
+                uploader.put(batch)
+                with tracer.span("store.keyword_index", chunks=len(batch["ids"])):
+                    self.keyword_index.add(batch["ids"], batch["documents"], [doc_id] * len(batch["ids"]))
+                chunk_count += len(batch["ids"])
+        # Measured on the uploader thread, overlapping the spans above.
+        tracer.record("store.upsert", uploader.upload_seconds, chunks=uploader.uploaded)
+
+        with tracer.span("store.save_indexes"):
+            self.keyword_index.save()
+            self.stats_index.record_document(doc_id, document_data["mime_type"], chunk_count)
+        return chunk_count
+
+    @property
+    def content_version(self) -> int:
+        return self.stats_index.version
+
+    def delete_document(self, doc_id: str):
+        self.collection.delete(where={"parent_doc_id": doc_id})
+        self.keyword_index.remove_parent(doc_id)
+        self.keyword_index.save()
+        self.table_store.delete_document(doc_id)
+        self.stats_index.remove_document(doc_id)
+
+    def store_tables(self, doc_id: str, document_data: Dict) -> Dict[int, Any]:
+        """Write every extracted table to the Parquet store; returns the frames by table_id for chunking."""
+        frames = {}
+        for table in document_data.get("tables", []):
+            frame = table_frame(table)
+            self.table_store.put(doc_id, table["table_id"], frame)
+            frames[table["table_id"]] = frame
+        return frames
+
+    def document_id(self, document_data: Dict) -> str:
+        # Content-derived so re-ingesting after a partial failure upserts the same ids.
+        digest = hashlib.sha256()
+        digest.update(document_data["filename"].encode("utf-8"))
+        if "file_hash" in document_data:
+            # Streamed documents: the text only exists window by window.
+            digest.update(document_data["file_hash"].encode("utf-8"))
+            return digest.hexdigest()[:32]
+        digest.update(document_data["text"].encode("utf-8"))
+        for table in document_data.get("tables", []):
+            digest.update(table_digest_bytes(table))
+        return digest.hexdigest()[:32]
+
+    def resolve_batch_size(self, batch_size: int = None) -> int:
+        batch_size = batch_size or env_data.CHROMA_BATCH_SIZE
+        if self._max_batch_size is None:
+            try:
+                self._max_batch_size = self.client.get_max_batch_size()
+            except Exception:
+                self._max_batch_size = batch_size
+        return max(1, min(batch_size, self._max_batch_size))
+
+    def chunk_options(self) -> Dict[str, Any]:
+        return {
+            "chunk_size": env_data.CHUNK_SIZE,
+            "overlap": env_data.CHUNK_OVERLAP,
+            "count_tokens": approx_token_count if env_data.CHUNK_UNIT == "tokens" else None
+        }
+
+    def iter_chunks(self, document_data: Dict, frames: Dict[int, Any] = None):
+        """Yield (chunk, provenance metadata) pairs lazily for the text and every table.
+
+        Tables are chunked by whole rows, each chunk repeating the header and
+        recording its row range in the table store.
+        """
+        options = self.chunk_options()
+
+        for chunk in iter_chunks(document_data["text"], page_spans=document_data.get("page_spans"), **options):
+            provenance = {"source": "text", "char_start": chunk.start, "char_end": chunk.end}
+            if chunk.page_start is not None:
+                provenance["page_start"] = chunk.page_start
+                provenance["page_end"] = chunk.page_end
+            yield chunk.text, provenance
+
+        frames = frames if frames is not None else {}
+        for table in document_data.get("tables", []):
+            frame = frames.get(table["table_id"])
+            if frame is None:
+                frame = table_frame(table)
+            for text, row_start, row_end in iter_table_chunks(frame, options["chunk_size"]):
+                provenance = {"source": "table", "table_id": table["table_id"], "row_start": row_start, "row_end": row_end}
+                yield text, provenance
+
+    def iter_window_chunks(self, doc_id: str, document_data: Dict, windows: Iterator[Dict]):
+        """iter_chunks over page windows, with char offsets as if the windows' text had been joined."""
+        offset = 0
+        for window in windows:
+            with tracer.span("store.tables", tables=len(window["tables"])):
+                frames = self.store_tables(doc_id, window)
+            # Set by the processor as it goes, so a chunk knows about the tables and pictures seen so far.
+            flags = {"has_tables": document_data["has_tables"], "has_images": document_data["has_images"]}
+            if window["text"] and offset:
+                offset += len(PAGE_DELIMITER)
+            for chunk, provenance in self.iter_chunks(window, frames):
+                if "char_start" in provenance:
+                    provenance["char_start"] += offset
+                    provenance["char_end"] += offset
+                yield chunk, dict(provenance, **flags)
+            offset += len(window["text"])
+
+    def iter_batches(self, doc_id: str, document_data: Dict, batch_size: int, frames: Dict[int, Any] = None,
+                     chunks: Iterator = None):
+        base_metadata = {
+            "filename": document_data["filename"],
+            "mime_type": document_data["mime_type"],
+            "processing_method": document_data["processing_method"],
+            "timestamp": document_data["timestamp"],
+            "parent_doc_id": doc_id,
+            "page_count": document_data.get("page_count", 1),
+            "has_tables": document_data.get("has_tables", False),
+            "has_images": document_data.get("has_images", False)
+        }
+
+        batch = {"ids": [], "documents": [], "metadatas": []}
+        # Chunking is interleaved with embedding, so its time is accumulated between batches.
+        chunk_seconds = 0.0
+        started = time.perf_counter()
+        chunks = chunks if chunks is not None else self.iter_chunks(document_data, frames)
+        for i, (chunk, provenance) in enumerate(chunks):
+            batch["ids"].append(f"{doc_id}_{i}")
+            batch["documents"].append(chunk)
+            batch["metadatas"].append(dict(base_metadata, chunk_index=i, **provenance))
+
+            if len(batch["ids"]) >= batch_size:
+                chunk_seconds += time.perf_counter() - started
+                yield self.embed_batch(batch)
+                batch = {"ids": [], "documents": [], "metadatas": []}
+                started = time.perf_counter()
+
+        chunk_seconds += time.perf_counter() - started
+        tracer.record("store.chunk", chunk_seconds)
+        if batch["ids"]:
+            yield self.embed_batch(batch)
+
+    def embed_batch(self, batch: Dict[str, list]) -> Dict[str, list]:
+        # Encoded here, on the producer side, so it overlaps with the previous batch's upload.
+        with tracer.span("store.embed", chunks=len(batch["documents"])):
+            batch["embeddings"] = self.embedder.embed_documents(batch["documents"])
+        return batch
     
     def split_text(self, text: str, chunk_size: int = 1000, overlap: int = 200, prefix: str = ""):
-        if not text:
-            return []
-        
-        words = text.split()
-        chunks = []
-        
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i:i + chunk_size])
-            if prefix:
-                chunk = prefix + chunk
-            chunks.append(chunk)
-            
-            if i + chunk_size >= len(words):
-                break
-        
-        return chunks
+        return split_text(text, chunk_size=chunk_size, overlap=overlap, prefix=prefix)
     
-    def search_documents(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results,
-            include=['documents', 'metadatas', 'distances']
-        )
-        
+    def search_documents(self, query: str, n_results: int = 5, query_embedding=None,
+                         include: List[str] = ('documents', 'metadatas', 'distances'), mode: str = None) -> List[Dict[str, Any]]:
+        """Retrieve chunks by vector similarity, BM25, or both fused with reciprocal rank fusion.
+
+        mode defaults to RETRIEVAL_MODE. In hybrid mode, short identifier-only
+        queries that BM25 can answer skip the vector query.
+        """
+        mode = mode or env_data.RETRIEVAL_MODE
+        if mode == "vector" or not len(self.keyword_index):
+            return self.vector_search(query, n_results, query_embedding, include)
+
+        with tracer.span("store.bm25_search"):
+            keyword_ids = [chunk_id for chunk_id, _ in self.keyword_index.search(query, n_results)]
+        if mode == "bm25" or (keyword_ids and is_keyword_query(query)):
+            return self.fetch_ranked(keyword_ids, query, query_embedding, include)
+
+        vector_results = self.vector_search(query, n_results, query_embedding, include)
+        fused_ids = reciprocal_rank_fusion([vector_results["ids"][0], keyword_ids])[:n_results]
+
+        vector_rows = {
+            chunk_id: i for i, chunk_id in enumerate(vector_results["ids"][0])
+        }
+        missing = [chunk_id for chunk_id in fused_ids if chunk_id not in vector_rows]
+        keyword_results = self.fetch_ranked(missing, query, query_embedding, include) if missing else None
+        keyword_rows = {chunk_id: i for i, chunk_id in enumerate(keyword_results["ids"][0])} if keyword_results else {}
+
+        fused = {"ids": [[]]}
+        for key in include:
+            fused[key] = [[]]
+        for chunk_id in fused_ids:
+            if chunk_id in vector_rows:
+                source, row = vector_results, vector_rows[chunk_id]
+            elif chunk_id in keyword_rows:
+                source, row = keyword_results, keyword_rows[chunk_id]
+            else:
+                continue
+            fused["ids"][0].append(chunk_id)
+            for key in include:
+                fused[key][0].append(source[key][0][row])
+        return fused
+
+    def vector_search(self, query: str, n_results: int, query_embedding=None,
+                      include: List[str] = ('documents', 'metadatas', 'distances')) -> Dict[str, Any]:
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_query(query)
+        with tracer.span("store.vector_search", n_results=n_results):
+            return self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                include=list(include)
+            )
+
+    def fetch_ranked(self, chunk_ids: List[str], query: str, query_embedding=None,
+                     include: List[str] = ('documents', 'metadatas', 'distances')) -> Dict[str, Any]:
+        """Fetch chunks by id in the given order, shaped like a query result."""
+        results = {"ids": [[]]}
+        for key in include:
+            results[key] = [[]]
+        if not chunk_ids:
+            return results
+
+        with tracer.span("store.fetch", chunks=len(chunk_ids)):
+            fetched = self.collection.get(ids=chunk_ids, include=["documents", "metadatas", "embeddings"])
+        rows = {chunk_id: i for i, chunk_id in enumerate(fetched["ids"])}
+
+        if "distances" in include and query_embedding is None:
+            query_embedding = self.embedder.embed_query(query)
+        if query_embedding is not None:
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            query_vector = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+
+        for chunk_id in chunk_ids:
+            if chunk_id not in rows:
+                continue
+            row = rows[chunk_id]
+            results["ids"][0].append(chunk_id)
+            if "documents" in include:
+                results["documents"][0].append(fetched["documents"][row])
+            if "metadatas" in include:
+                results["metadatas"][0].append(fetched["metadatas"][row])
+            if "embeddings" in include:
+                results["embeddings"][0].append(fetched["embeddings"][row])
+            if "distances" in include:
+                vector = np.asarray(fetched["embeddings"][row], dtype=np.float32)
+                similarity = float(vector @ query_vector / max(np.linalg.norm(vector), 1e-12))
+                results["distances"][0].append(1 - similarity)
         return results
+
+    def expand_table_hits(self, results: Dict[str, Any], query: str) -> Dict[str, Any]:
+        """Swap table chunks in query results for the rows of their table that match the query.
+
+        Each table contributes one slice, at the rank of its best chunk; other
+        chunks of the same table are dropped. Chunks ingested before the table
+        store existed have no row range and are left as they are.
+        """
+        if not results.get("documents") or not results["documents"][0] or not results.get("metadatas"):
+            return results
+
+        count = len(results["documents"][0])
+        keep = []
+        documents = []
+        seen = set()
+        for i, (document, metadata) in enumerate(zip(results["documents"][0], results["metadatas"][0])):
+            if metadata.get("source") == "table" and "row_start" in metadata:
+                key = (metadata["parent_doc_id"], metadata["table_id"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                with tracer.span("store.table_slice"):
+                    sliced = self.table_store.slice(key[0], key[1], query, (metadata["row_start"], metadata["row_end"]))
+                document = sliced if sliced is not None else document
+            keep.append(i)
+            documents.append(document)
+
+        expanded = {}
+        for key, value in results.items():
+            rows = value[0] if isinstance(value, list) and value else None
+            if rows is not None and not isinstance(rows, str) and hasattr(rows, "__len__") and len(rows) == count:
+                expanded[key] = [[rows[i] for i in keep]]
+            else:
+                expanded[key] = value
+        expanded["documents"] = [documents]
+        return expanded
+
+    def rebuild_keyword_index(self, page_size: int = 1000):
+        def rows():
+            offset = 0
+            while True:
+                page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    yield chunk_id, document, metadata.get("parent_doc_id", "")
+                if len(page["ids"]) < page_size:
+                    break
+                offset += page_size
+
+        self.keyword_index.rebuild(rows())
     
     def get_all_documents(self) -> List[Dict[str, Any]]:
         results = self.collection.get()
         return results
     
     def get_document_stats(self) -> Dict[str, Any]:
-        all_docs = self.get_all_documents()
-        
-        if not all_docs['metadatas']:
-            return {"total_chunks": 0, "unique_documents": 0, "file_types": {}}
-        
-        unique_docs = set()
-        file_types = {}
-        
-        for metadata in all_docs['metadatas']:
-            unique_docs.add(metadata['parent_doc_id'])
-            mime_type = metadata.get('mime_type', 'unknown')
-            file_types[mime_type] = file_types.get(mime_type, 0) + 1
-        
-        return {
-            "total_chunks": len(all_docs['metadatas']),
-            "unique_documents": len(unique_docs),
-            "file_types": file_types
-        }
+        return self.stats_index.stats()
+
+    def reconcile_stats(self) -> Dict[str, Any]:
+        self.stats_index.rebuild(self.collection)
+        return self.stats_index.stats()
         
     
     def clear_collection(self, collection_name):
-        try:
-            self.client.delete_collection(name=collection_name)
-        except:
-            import traceback
-            traceback.print_exc()
\ No newline at end of file
+        # Local indexes are cleared even when the delete fails; the failure itself is raised.
+        self.pool.drop(collection_name)
\ No newline at end of file
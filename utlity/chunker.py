@@ -0,0 +1,95 @@
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+import re
+
+
+WORD_PATTERN = re.compile(r"\S+")
+
+
+@dataclass
+class Chunk:
+    text: str
+    index: int
+    start: int
+    end: int
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+
+def approx_token_count(word: str) -> int:
+    # Roughly four characters per token for English text with common tokenizers.
+    return max(1, (len(word) + 3) // 4)
+
+
+class PageLocator:
+    """Maps character offsets to page numbers using the (page_no, start, end) spans of the text."""
+
+    def __init__(self, page_spans: Sequence[Tuple[int, int, int]]):
+        self.starts = [start for _, start, _ in page_spans]
+        self.pages = [page_no for page_no, _, _ in page_spans]
+
+    def page_at(self, offset: int) -> Optional[int]:
+        position = bisect_right(self.starts, offset) - 1
+        if position < 0:
+            return self.pages[0] if self.pages else None
+        return self.pages[position]
+
+
+def iter_chunks(
+    text: str,
+    chunk_size: int = 1000,
+    overlap: int = 200,
+    prefix: str = "",
+    page_spans: Sequence[Tuple[int, int, int]] = None,
+    count_tokens: Callable[[str], int] = None,
+) -> Iterator[Chunk]:
+    """Lazily yield overlapping chunks of ``text`` with character offsets and pages.
+
+    Sizes are in words, or in tokens when ``count_tokens`` is given. Only the
+    offsets of the current window are held, so memory does not grow with the
+    length of the document; each chunk is a single slice of ``text``.
+    """
+    if not text:
+        return
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+
+    locator = PageLocator(page_spans) if page_spans else None
+    window = deque()  # (start, end, size) for each word in the current chunk
+    window_size = 0
+    fresh = False  # window holds words not yet emitted
+    index = 0
+
+    def emit() -> Chunk:
+        start, end = window[0][0], window[-1][1]
+        return Chunk(
+            text=prefix + text[start:end],
+            index=index,
+            start=start,
+            end=end,
+            page_start=locator.page_at(start) if locator else None,
+            page_end=locator.page_at(end - 1) if locator else None
+        )
+
+    for match in WORD_PATTERN.finditer(text):
+        size = count_tokens(match.group()) if count_tokens else 1
+
+        if window and window_size + size > chunk_size:
+            yield emit()
+            index += 1
+            fresh = False
+            while window and window_size > overlap:
+                window_size -= window.popleft()[2]
+
+        window.append((match.start(), match.end(), size))
+        window_size += size
+        fresh = True
+
+    if fresh:
+        yield emit()
+
+
+def split_text(text: str, chunk_size: int = 1000, overlap: int = 200, prefix: str = "") -> List[str]:
+    return [chunk.text for chunk in iter_chunks(text, chunk_size, overlap, prefix)]
@@ -0,0 +1,284 @@
+import json
+import os
+import re
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+from utlity.env_load import env_data
+from utlity.vector_store import create_client, hnsw_metadata
+from utlity.doc_stats import get_stats_index
+from utlity.bm25_index import check_collection_name, get_bm25_index
+from utlity.table_store import get_table_store
+
+
+COLLECTION_MODES = ("session", "shared")
+
+# Namespaces main.py gives browser sessions ("col" + uuid4); only these are adopted for reaping.
+SESSION_NAMESPACE = re.compile(r"^col[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+# Last-use times are written back at most this often per namespace.
+TOUCH_SAVE_SECONDS = 60.0
+
+
+def is_missing_collection(error: Exception) -> bool:
+    """Chroma raises NotFoundError (a ValueError before 1.0) for a collection that doesn't exist."""
+    return type(error).__name__ == "NotFoundError" or (isinstance(error, ValueError) and "does not exist" in str(error))
+
+
+class NamespacedCollection:
+    """One namespace's view of a shared collection.
+
+    Writes tag every chunk with the namespace and prefix its id, reads and
+    deletes are filtered on the tag, and ids come back unprefixed, so
+    ChromaDBManager can't tell it from a collection of its own.
+    """
+
+    FIELD = "namespace"
+
+    def __init__(self, collection, namespace: str):
+        self.collection = collection
+        self.namespace = namespace
+        self.name = namespace
+        self._prefix = f"{namespace}:"
+
+    def _where(self, where: Optional[Dict] = None) -> Dict:
+        clause = {self.FIELD: self.namespace}
+        return {"$and": [where, clause]} if where else clause
+
+    def _ids(self, ids):
+        return None if ids is None else [self._prefix + chunk_id for chunk_id in ids]
+
+    def _strip(self, ids: List[str]) -> List[str]:
+        return [chunk_id[len(self._prefix):] for chunk_id in ids]
+
+    def count(self) -> int:
+        return len(self.collection.get(where=self._where(), include=[])["ids"])
+
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        metadatas = [dict(metadata or {}, **{self.FIELD: self.namespace}) for metadata in (metadatas or [{}] * len(ids))]
+        return self.collection.upsert(ids=self._ids(ids), embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def get(self, ids=None, where: Dict = None, **kwargs) -> Dict[str, Any]:
+        result = self.collection.get(ids=self._ids(ids), where=self._where(where), **kwargs)
+        result["ids"] = self._strip(result["ids"])
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict = None, **kwargs) -> Dict[str, Any]:
+        result = self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=self._where(where), **kwargs)
+        result["ids"] = [self._strip(ids) for ids in result["ids"]]
+        return result
+
+    def delete(self, ids=None, where: Dict = None):
+        return self.collection.delete(ids=self._ids(ids), where=self._where(where))
+
+
+class CollectionPool:
+    """Process-wide vector-store client and collection handles for every session namespace.
+
+    A namespace is a session's own collection (COLLECTION_MODE=session) or
+    its slice of SHARED_COLLECTION (COLLECTION_MODE=shared). The last use of
+    each namespace this host has served is kept in a JSON sidecar, so the
+    reaper still drops data left idle for SESSION_TTL_SECONDS after a
+    restart, and never touches namespaces only other replicas know about.
+    """
+
+    def __init__(self, client=None, mode: str = None, shared_collection: str = None, state_path: str = None):
+        self.mode = mode or env_data.COLLECTION_MODE
+        if self.mode not in COLLECTION_MODES:
+            raise ValueError(f"Unknown collection mode '{self.mode}', expected one of {', '.join(COLLECTION_MODES)}")
+        self.shared_collection = shared_collection or env_data.SHARED_COLLECTION
+        self.state_path = state_path
+        self._client = client
+        self._lock = threading.RLock()
+        self._handles = {}
+        self._last_used = self._load()
+        self._saved = dict(self._last_used)
+        self._reaper = None
+        self._stop = threading.Event()
+        # Called with the namespace after its data is dropped, e.g. to forget its ingestion jobs.
+        self.on_drop: List[Callable[[str], None]] = []
+        self.counters = {"handles_opened": 0, "reclaimed": 0, "reap_runs": 0, "reap_errors": 0}
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = create_client(env_data.VECTOR_BACKEND)
+            return self._client
+
+    def _load(self) -> Dict[str, float]:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._last_used, f, separators=(",", ":"))
+        os.replace(tmp_path, self.state_path)
+        self._saved = dict(self._last_used)
+
+    def collection(self, namespace: str):
+        """Cached handle for a namespace, created on first use."""
+        with self._lock:
+            handle = self._handles.get(namespace)
+            if handle is None:
+                if self.mode == "shared":
+                    shared = self._handles.get(None)
+                    if shared is None:
+                        shared = self._handles[None] = self.client.get_or_create_collection(
+                            name=self.shared_collection, metadata=hnsw_metadata()
+                        )
+                    handle = NamespacedCollection(shared, namespace)
+                else:
+                    handle = self.client.get_or_create_collection(name=namespace, metadata=hnsw_metadata())
+                self._handles[namespace] = handle
+                self.counters["handles_opened"] += 1
+            self.touch(namespace)
+            return handle
+
+    def touch(self, namespace: str):
+        with self._lock:
+            now = time.time()
+            self._last_used[namespace] = now
+            if now - self._saved.get(namespace, 0.0) >= TOUCH_SAVE_SECONDS:
+                self._save()
+
+    def drop(self, namespace: str):
+        """Delete a namespace's chunks and local indexes and forget its handle.
+
+        A collection that is already gone counts as dropped. Any other error
+        is raised after the local state has been cleared, and the namespace
+        stays tracked so the reaper tries again.
+        """
+        check_collection_name(namespace)
+        with self._lock:
+            self._handles.pop(namespace, None)
+            shared = self._handles.get(None)
+
+        error = None
+        try:
+            if self.mode == "shared":
+                if shared is None:
+                    shared = self.client.get_or_create_collection(name=self.shared_collection, metadata=hnsw_metadata())
+                shared.delete(where={NamespacedCollection.FIELD: namespace})
+            else:
+                self.client.delete_collection(name=namespace)
+        except Exception as e:
+            if not is_missing_collection(e):
+                error = e
+
+        get_stats_index(namespace).reset()
+        get_bm25_index(namespace).clear()
+        get_table_store(namespace).clear()
+        for callback in self.on_drop:
+            callback(namespace)
+
+        if error is not None:
+            raise error
+        with self._lock:
+            self._last_used.pop(namespace, None)
+            self._save()
+            self.counters["reclaimed"] += 1
+
+    def adopt(self) -> int:
+        """Start the TTL clock for session collections no sidecar knows about, e.g. from before the reaper existed.
+
+        Only safe when this host is the only one serving the database: the
+        sidecar is local, so another replica's live sessions would look idle
+        here. start_reaper only calls it with REAPER_ADOPT set.
+        """
+        if self.mode != "session":
+            return 0
+        now = time.time()
+        adopted = 0
+        with self._lock:
+            for collection in self.client.list_collections():
+                # Depending on the chromadb version these are Collection objects or names.
+                name = getattr(collection, "name", collection)
+                if SESSION_NAMESPACE.match(name) and name not in self._last_used:
+                    self._last_used[name] = now
+                    adopted += 1
+            if adopted:
+                self._save()
+        return adopted
+
+    def idle(self, ttl: float) -> List[str]:
+        cutoff = time.time() - ttl
+        with self._lock:
+            return [namespace for namespace, last_used in self._last_used.items() if last_used < cutoff]
+
+    def reap(self, ttl: float = None) -> List[str]:
+        """Drop every namespace unused for ``ttl`` seconds; returns the ones dropped."""
+        ttl = ttl if ttl is not None else env_data.SESSION_TTL_SECONDS
+        dropped = []
+        for namespace in self.idle(ttl):
+            try:
+                self.drop(namespace)
+                dropped.append(namespace)
+            except Exception:
+                self.counters["reap_errors"] += 1
+                traceback.print_exc()
+        self.counters["reap_runs"] += 1
+        return dropped
+
+    def start_reaper(self, interval: float = None, ttl: float = None):
+        """Reap idle namespaces every ``interval`` seconds on a daemon thread; a no-op when SESSION_TTL_SECONDS is 0."""
+        ttl = ttl if ttl is not None else env_data.SESSION_TTL_SECONDS
+        interval = interval or env_data.REAPER_INTERVAL_SECONDS
+        with self._lock:
+            if self._reaper is not None or not ttl:
+                return self
+            if env_data.REAPER_ADOPT:
+                self.adopt()
+            self._reaper = threading.Thread(target=self._reap_loop, args=(interval, ttl), name="collection-reaper", daemon=True)
+            self._reaper.start()
+        return self
+
+    def stop_reaper(self):
+        self._stop.set()
+        if self._reaper is not None:
+            self._reaper.join()
+
+    def _reap_loop(self, interval: float, ttl: float):
+        while not self._stop.wait(interval):
+            self.reap(ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_handles = sum(1 for namespace in self._handles if namespace is not None)
+            return dict(self.counters, mode=self.mode, open_handles=open_handles, tracked_namespaces=len(self._last_used))
+
+    def prometheus_text(self) -> str:
+        stats = self.stats()
+        return "\n".join([
+            "# HELP docqa_open_collection_handles Collection handles cached by this process.",
+            "# TYPE docqa_open_collection_handles gauge",
+            f"docqa_open_collection_handles {stats['open_handles']}",
+            "# HELP docqa_tracked_namespaces Session namespaces with a recorded last use.",
+            "# TYPE docqa_tracked_namespaces gauge",
+            f"docqa_tracked_namespaces {stats['tracked_namespaces']}",
+            "# HELP docqa_reclaimed_namespaces_total Session collections or namespaces dropped.",
+            "# TYPE docqa_reclaimed_namespaces_total counter",
+            f"docqa_reclaimed_namespaces_total {stats['reclaimed']}",
+        ]) + "\n"
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_collection_pool() -> CollectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CollectionPool(state_path=os.path.join(env_data.CACHE_DIR, "namespaces.json"))
+        return _pool
@@ -0,0 +1,159 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+import numpy as np
+from utlity.chunker import approx_token_count
+
+
+TABLE_PREFIX = "TABLE: "
+
+
+def estimate_tokens(text: str) -> int:
+    return sum(approx_token_count(word) for word in text.split())
+
+
+@dataclass
+class Passage:
+    text: str
+    metadatas: List[Dict[str, Any]]
+    distance: float
+    rank: int
+
+
+@dataclass
+class PackedContext:
+    context: str
+    metadatas: List[Dict[str, Any]]
+    distances: List[float]
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+def mmr(query: np.ndarray, vectors: np.ndarray, k: int, lambda_: float = 0.7) -> List[int]:
+    """Maximal marginal relevance: greedily trade similarity to the query against redundancy."""
+    if len(vectors) == 0:
+        return []
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = query / max(np.linalg.norm(query), 1e-12)
+    relevance = vectors @ query
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = vectors @ vectors[selected[0]]
+    while len(selected) < min(k, len(vectors)):
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+    return selected
+
+
+def _body(text: str, metadata: Dict[str, Any]) -> str:
+    if metadata.get("source") == "table" and text.startswith(TABLE_PREFIX):
+        return text[len(TABLE_PREFIX):]
+    return text
+
+
+def merge_adjacent(documents: Sequence[str], metadatas: Sequence[Dict[str, Any]], distances: Sequence[float]) -> List[Passage]:
+    """Join consecutive chunks of the same document, dropping the overlap they share.
+
+    Chunks are consecutive when their chunk_index differs by one; the overlap
+    is cut using the char_start/char_end offsets recorded at ingestion.
+    The list order (rank) is kept by each passage's best-ranked chunk.
+    """
+    order = sorted(
+        range(len(documents)),
+        key=lambda i: (metadatas[i].get("parent_doc_id", ""), metadatas[i].get("chunk_index", 0))
+    )
+
+    passages = []
+    previous = None
+    for i in order:
+        metadata = metadatas[i]
+        adjacent = (
+            previous is not None
+            and metadata.get("parent_doc_id") == previous["metadata"].get("parent_doc_id")
+            and metadata.get("chunk_index") == previous["metadata"].get("chunk_index", -2) + 1
+            and metadata.get("source") == previous["metadata"].get("source")
+            and metadata.get("table_id") == previous["metadata"].get("table_id")
+            and "char_start" in metadata and "char_end" in previous["metadata"]
+        )
+
+        if adjacent:
+            passage = passages[-1]
+            overlap = max(0, previous["metadata"]["char_end"] - metadata["char_start"])
+            passage.text += _body(documents[i], metadata)[overlap:]
+            passage.metadatas.append(metadata)
+            passage.distance = min(passage.distance, distances[i])
+            passage.rank = min(passage.rank, i)
+        else:
+            passages.append(Passage(text=documents[i], metadatas=[metadata], distance=distances[i], rank=i))
+
+        previous = {"metadata": metadata}
+
+    passages.sort(key=lambda passage: passage.rank)
+    return passages
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    words = []
+    used = 0
+    for word in text.split():
+        cost = approx_token_count(word)
+        if used + cost > budget:
+            break
+        words.append(word)
+        used += cost
+    return " ".join(words)
+
+
+def pack_context(query_embedding, results: Dict[str, list], k: int = 8, token_budget: int = 3000,
+                 lambda_: float = 0.7) -> PackedContext:
+    """Rerank over-fetched query results with MMR, merge neighbours and fit them into ``token_budget``."""
+    documents = results["documents"][0]
+    metadatas = results["metadatas"][0]
+    distances = results["distances"][0]
+
+    # What the prompt used to get: the top k chunks verbatim.
+    baseline_tokens = estimate_tokens("\n\n".join(documents[:k]))
+
+    embeddings = results.get("embeddings")
+    if embeddings is not None and len(embeddings) and len(embeddings[0]):
+        selected = mmr(np.asarray(query_embedding, dtype=np.float32), np.asarray(embeddings[0], dtype=np.float32), k, lambda_)
+    else:
+        selected = list(range(min(k, len(documents))))
+
+    passages = merge_adjacent(
+        [documents[i] for i in selected],
+        [metadatas[i] for i in selected],
+        [distances[i] for i in selected]
+    )
+
+    parts = []
+    packed_metadatas = []
+    packed_distances = []
+    used = 0
+    for passage in passages:
+        remaining = token_budget - used
+        if remaining <= 0:
+            break
+        tokens = estimate_tokens(passage.text)
+        text = passage.text if tokens <= remaining else truncate_to_tokens(passage.text, remaining)
+        if not text:
+            break
+        parts.append(text)
+        used += min(tokens, remaining)
+        packed_metadatas.append(passage.metadatas[0])
+        packed_distances.append(passage.distance)
+
+    return PackedContext(
+        context="\n\n".join(parts),
+        metadatas=packed_metadatas,
+        distances=packed_distances,
+        stats={
+            "candidates": len(documents),
+            "selected_chunks": len(selected),
+            "passages": len(parts),
+            "baseline_tokens": baseline_tokens,
+            "context_tokens": used,
+            "tokens_saved": max(0, baseline_tokens - used)
+        }
+    )
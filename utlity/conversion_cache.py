@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+from utlity.env_load import env_data
+
+
+class ConversionCache:
+    """On-disk cache of extracted document data.
+
+    Entries are keyed by the file's SHA-256 plus the pipeline fingerprint and
+    stored as gzipped JSON. Reads refresh the entry's mtime, and writes evict
+    the least recently used entries once the directory exceeds ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def file_digest(filepath: str) -> str:
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def key(self, filepath: str, pipeline_fingerprint: str) -> str:
+        return f"{self.file_digest(filepath)}_{pipeline_fingerprint}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: Dict):
+        if not self.enabled:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(data, f, separators=(",", ":"), default=str)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith(".json.gz"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+conversion_cache = ConversionCache(
+    cache_dir=os.path.join(env_data.CACHE_DIR, "conversions"),
+    max_bytes=env_data.CONVERSION_CACHE_MB * 1024 * 1024
+)
@@ -0,0 +1,151 @@
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict
+from utlity.env_load import env_data
+from utlity.bm25_index import check_collection_name
+
+
+class DocumentStatsIndex:
+    """Per-collection document counters kept in a local JSON sidecar.
+
+    Updated on every add and delete so the sidebar numbers are O(1) reads
+    instead of a scan over every chunk. ``version`` increases on every change
+    and doubles as the collection's content version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = self._load()
+
+    @staticmethod
+    def _empty() -> Dict[str, Any]:
+        return {"version": 0, "total_chunks": 0, "file_types": {}, "documents": {}}
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return self._empty()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    @property
+    def version(self) -> int:
+        return self._data["version"]
+
+    @property
+    def total_chunks(self) -> int:
+        return self._data["total_chunks"]
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._data["documents"]
+
+    def _remove(self, doc_id: str):
+        previous = self._data["documents"].pop(doc_id, None)
+        if previous is None:
+            return
+        self._data["total_chunks"] -= previous["chunks"]
+        file_types = self._data["file_types"]
+        file_types[previous["mime_type"]] = file_types.get(previous["mime_type"], 0) - previous["chunks"]
+        if file_types[previous["mime_type"]] <= 0:
+            del file_types[previous["mime_type"]]
+
+    def _add(self, doc_id: str, mime_type: str, chunks: int):
+        self._data["documents"][doc_id] = {"chunks": chunks, "mime_type": mime_type}
+        self._data["total_chunks"] += chunks
+        file_types = self._data["file_types"]
+        file_types[mime_type] = file_types.get(mime_type, 0) + chunks
+
+    def record_document(self, doc_id: str, mime_type: str, chunks: int):
+        with self._lock:
+            # Re-ingesting the same content upserts the same chunk ids, so replace rather than add.
+            self._remove(doc_id)
+            self._add(doc_id, mime_type or "unknown", chunks)
+            self._data["version"] += 1
+            self._save()
+
+    def remove_document(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+            self._data["version"] += 1
+            self._save()
+
+    def reset(self):
+        with self._lock:
+            version = self._data["version"]
+            self._data = self._empty()
+            self._data["version"] = version + 1
+            self._save()
+
+    def rebuild(self, collection, page_size: int = 1000):
+        """Recompute the counters from a metadata-only scan of the collection."""
+        documents = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            metadatas = page.get("metadatas") or []
+            for metadata in metadatas:
+                entry = documents.setdefault(
+                    metadata["parent_doc_id"],
+                    {"chunks": 0, "mime_type": metadata.get("mime_type", "unknown")}
+                )
+                entry["chunks"] += 1
+            if len(metadatas) < page_size:
+                break
+            offset += page_size
+
+        with self._lock:
+            version = self._data["version"]
+            self._data = self._empty()
+            self._data["version"] = version + 1
+            for doc_id, entry in documents.items():
+                self._add(doc_id, entry["mime_type"], entry["chunks"])
+            self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_chunks": self._data["total_chunks"],
+                "unique_documents": len(self._data["documents"]),
+                "file_types": dict(self._data["file_types"])
+            }
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_stats_index(collection_name: str) -> DocumentStatsIndex:
+    # One instance per collection per process, so every manager sees the same counters.
+    check_collection_name(collection_name)
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None:
+            index = DocumentStatsIndex(os.path.join(env_data.CACHE_DIR, "stats", f"{collection_name}.json"))
+            _indexes[collection_name] = index
+        return index
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python -m utlity.doc_stats <collection_name>")
+        sys.exit(2)
+
+    from utlity.chromadb import ChromaDBManager
+    manager = ChromaDBManager(collection_name=sys.argv[1])
+    manager.stats_index.rebuild(manager.collection)
+    print(json.dumps(manager.get_document_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
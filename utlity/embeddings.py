@@ -0,0 +1,105 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Sequence
+import numpy as np
+from utlity.env_load import env_data
+from utlity.model_registry import ModelRegistry, model_registry
+
+
+class EmbeddingCache:
+    """SQLite-backed store of embedding vectors keyed by model name and chunk-text hash."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        return self._conn
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            # Stay well under SQLite's bound-parameter limit.
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+            )
+            conn.commit()
+
+
+embedding_cache = EmbeddingCache(os.path.join(env_data.CACHE_DIR, "embeddings.sqlite"))
+
+
+class EmbeddingEngine:
+    """Encodes chunks locally with sentence-transformers in large CPU batches, through the cache."""
+
+    def __init__(self, model_name: str = None, batch_size: int = None, cache: EmbeddingCache = embedding_cache,
+                 registry: ModelRegistry = model_registry):
+        self.model_name = model_name or env_data.EMBEDDING_MODEL
+        self.batch_size = batch_size or env_data.EMBEDDING_BATCH_SIZE
+        self.cache = cache
+        self.registry = registry
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self):
+        return self.registry.get_embedding_model(self.model_name)
+
+    def embed_documents(self, texts: Sequence[str]) -> List[np.ndarray]:
+        keys = [EmbeddingCache.key(self.model_name, text) for text in texts]
+        cached = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.model.encode(
+                list(missing.values()),
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            ).astype(np.float32)
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
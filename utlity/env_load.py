@@ -12,6 +12,48 @@ class LoadEnv:
     CHROMA_TENANT:str= os.getenv("CHROMA_TENANT")
     CHROMA_DATABASE:str=os.getenv("CHROMA_DATABASE")
     GOOGLE_API_KEY:str= os.getenv("GOOGLE_API_KEY")
+    VECTOR_BACKEND:str = os.getenv("VECTOR_BACKEND", "cloud")
+    CHROMA_PATH:str = os.getenv("CHROMA_PATH", ".chroma")
+    HNSW_EF:int = int(os.getenv("HNSW_EF", "100"))
+    HNSW_CONSTRUCTION_EF:int = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+    HNSW_M:int = int(os.getenv("HNSW_M", "16"))
+    CHROMA_BATCH_SIZE:int = int(os.getenv("CHROMA_BATCH_SIZE", "256"))
+    CHROMA_UPLOAD_QUEUE:int = int(os.getenv("CHROMA_UPLOAD_QUEUE", "4"))
+    CHUNK_SIZE:int = int(os.getenv("CHUNK_SIZE", "1000"))
+    CHUNK_OVERLAP:int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    CHUNK_UNIT:str = os.getenv("CHUNK_UNIT", "words")
+    EMBEDDING_MODEL:str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDING_BATCH_SIZE:int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    RETRIEVAL_MODE:str = os.getenv("RETRIEVAL_MODE", "hybrid")
+    CONTEXT_CHUNKS:int = int(os.getenv("CONTEXT_CHUNKS", "8"))
+    CONTEXT_OVERFETCH:int = int(os.getenv("CONTEXT_OVERFETCH", "3"))
+    CONTEXT_TOKEN_BUDGET:int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    MMR_LAMBDA:float = float(os.getenv("MMR_LAMBDA", "0.7"))
+    ANSWER_CACHE_SIZE:int = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+    ANSWER_CACHE_TTL:float = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_THRESHOLD:float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    CACHE_DIR:str = os.getenv("CACHE_DIR", ".cache")
+    CONVERSION_CACHE_MB:int = int(os.getenv("CONVERSION_CACHE_MB", "512"))
+    OCR_WORKERS:int = int(os.getenv("OCR_WORKERS", "1"))
+    OCR_PROFILE:str = os.getenv("OCR_PROFILE", "accurate")
+    OCR_THREADS:int = int(os.getenv("OCR_THREADS", "0"))
+    OCR_PAGES_PER_TASK:int = int(os.getenv("OCR_PAGES_PER_TASK", "4"))
+    IMAGE_PREPROCESS:bool = os.getenv("IMAGE_PREPROCESS", "true").lower() in ("1", "true", "yes")
+    INGEST_CONCURRENCY:int = int(os.getenv("INGEST_CONCURRENCY", "2"))
+    OCR_WARMUP:bool = os.getenv("OCR_WARMUP", "false").lower() in ("1", "true", "yes")
+    TABLE_SLICE_ROWS:int = int(os.getenv("TABLE_SLICE_ROWS", "20"))
+    TRACING:bool = os.getenv("TRACING", "false").lower() in ("1", "true", "yes")
+    TRACE_FILE:str = os.getenv("TRACE_FILE", "")
+    OCR_MODEL_DIR:str = os.getenv("OCR_MODEL_DIR", "")
+    DOCLING_ARTIFACTS_PATH:str = os.getenv("DOCLING_ARTIFACTS_PATH", "")
+    STREAM_MIN_PAGES:int = int(os.getenv("STREAM_MIN_PAGES", "100"))
+    STREAM_WINDOW_PAGES:int = int(os.getenv("STREAM_WINDOW_PAGES", "8"))
+    CONVERSION_MEMORY_MB:int = int(os.getenv("CONVERSION_MEMORY_MB", "0"))
+    COLLECTION_MODE:str = os.getenv("COLLECTION_MODE", "session")
+    SHARED_COLLECTION:str = os.getenv("SHARED_COLLECTION", "documents")
+    SESSION_TTL_SECONDS:float = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+    REAPER_INTERVAL_SECONDS:float = float(os.getenv("REAPER_INTERVAL_SECONDS", "600"))
+    REAPER_ADOPT:bool = os.getenv("REAPER_ADOPT", "false").lower() in ("1", "true", "yes")
     
     
 
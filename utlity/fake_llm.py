@@ -0,0 +1,57 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator
+
+
+@dataclass
+class FakeMessage:
+    content: str
+
+
+class FakeStreamingLLM:
+    """Offline stand-in for the chat model with controllable latency.
+
+    ``first_token_delay`` models the time until the model starts answering
+    and ``token_delay`` the time between streamed tokens, so time-to-first-token
+    and total generation time can be checked without an API key.
+    """
+
+    def __init__(self, response: str = "This is a canned answer generated offline.",
+                 first_token_delay: float = 0.3, token_delay: float = 0.02):
+        self.response = response
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def _tokens(self):
+        words = self.response.split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def invoke(self, prompt) -> FakeMessage:
+        self.calls += 1
+        tokens = self._tokens()
+        time.sleep(self.first_token_delay + self.token_delay * max(len(tokens) - 1, 0))
+        return FakeMessage(content=self.response)
+
+    def stream(self, prompt) -> Iterator[FakeMessage]:
+        self.calls += 1
+        time.sleep(self.first_token_delay)
+        for i, token in enumerate(self._tokens()):
+            if i:
+                time.sleep(self.token_delay)
+            yield FakeMessage(content=token)
+
+    async def ainvoke(self, prompt) -> FakeMessage:
+        self.calls += 1
+        tokens = self._tokens()
+        await asyncio.sleep(self.first_token_delay + self.token_delay * max(len(tokens) - 1, 0))
+        return FakeMessage(content=self.response)
+
+    async def astream(self, prompt) -> AsyncIterator[FakeMessage]:
+        self.calls += 1
+        await asyncio.sleep(self.first_token_delay)
+        for i, token in enumerate(self._tokens()):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield FakeMessage(content=token)
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import List, Sequence, Tuple
+import os
+import cv2
+import numpy as np
+
+
+# Below this Laplacian variance the image is soft enough that sharpening helps.
+BLUR_VARIANCE_THRESHOLD = 150.0
+# Below this grey-level standard deviation the page is washed out or unevenly lit.
+LOW_CONTRAST_THRESHOLD = 50.0
+# Estimates run on a downscaled copy; quality statistics barely change with size.
+QUALITY_SAMPLE_SIDE = 512
+
+
+@dataclass
+class ImageQuality:
+    contrast: float
+    blur_variance: float
+
+    @property
+    def is_blurry(self) -> bool:
+        return self.blur_variance < BLUR_VARIANCE_THRESHOLD
+
+    @property
+    def is_low_contrast(self) -> bool:
+        return self.contrast < LOW_CONTRAST_THRESHOLD
+
+
+def to_gray(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def estimate_quality(gray: np.ndarray) -> ImageQuality:
+    height, width = gray.shape
+    scale = QUALITY_SAMPLE_SIDE / max(height, width)
+    if scale < 1:
+        gray = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    return ImageQuality(
+        contrast=float(gray.std()),
+        blur_variance=float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    )
+
+
+def unsharp_mask(gray: np.ndarray, sigma: float = 2.0, amount: float = 1.5) -> np.ndarray:
+    blurred = cv2.GaussianBlur(gray, (0, 0), sigma)
+    return cv2.addWeighted(gray, 1 + amount, blurred, -amount, 0)
+
+
+def preprocess_array(image: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """Grayscale an image and apply only the clean-up steps its quality calls for.
+
+    Returns the processed array and the names of the steps that ran.
+    """
+    gray = to_gray(image)
+    steps = ["grayscale"]
+    quality = estimate_quality(gray)
+
+    if quality.is_blurry:
+        gray = unsharp_mask(gray)
+        steps.append("unsharp_mask")
+
+    if quality.is_low_contrast:
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        gray = cv2.adaptiveThreshold(
+            blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+        )
+        steps.append("adaptive_threshold")
+
+    return gray, steps
+
+
+def preprocess_batch(images: Sequence[np.ndarray], workers: int = None) -> List[Tuple[np.ndarray, List[str]]]:
+    # OpenCV releases the GIL, so a thread pool keeps every core busy without copying arrays between processes.
+    if len(images) <= 1:
+        return [preprocess_array(image) for image in images]
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(preprocess_array, images))
+
+
+def encode_png(image: np.ndarray) -> BytesIO:
+    ok, buffer = cv2.imencode(".png", image)
+    if not ok:
+        raise ValueError("Could not encode preprocessed image")
+    return BytesIO(buffer.tobytes())
@@ -0,0 +1,257 @@
+"""Headless bulk ingestion of a directory tree or a manifest of files.
+
+Conversion runs on a pool of worker threads; converted documents wait in a
+bounded queue for the single thread that writes to the vector store, so a
+slow store holds conversion back instead of piling documents up in memory.
+Every stored file's hash is appended to a checkpoint file, and a rerun with
+the same checkpoint skips those files, so an interrupted run resumes where
+it stopped.
+
+    python -m utlity.ingest_cli /data/archive --collection archive --workers 4
+    python -m utlity.ingest_cli --manifest files.txt --collection archive --profile fast --report run.jsonl
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Iterator, List, Set
+from utlity.collection_pool import CollectionPool
+from utlity.conversion_cache import ConversionCache
+from utlity.chromadb import ChromaDBManager
+from utlity.documnet_proesser import DocumentProcessor
+from utlity.llm import ingest_file
+from utlity.model_registry import PROFILES
+from utlity.env_load import env_data
+
+
+# The file types the upload widget in main.py accepts.
+SUPPORTED_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg")
+
+INGESTED = "ingested"
+SKIPPED = "skipped"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+
+def iter_paths(inputs: List[str]) -> Iterator[str]:
+    """Supported files under each input, directories walked recursively in sorted order."""
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def read_manifest(manifest: str) -> List[str]:
+    """One path per line; blank lines and lines starting with # are ignored, relative paths are relative to the manifest."""
+    base = os.path.dirname(os.path.abspath(manifest))
+    paths = []
+    with open(manifest, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                paths.append(os.path.join(base, line))
+    return paths
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class BatchIngest:
+    """Feeds files through conversion workers and one store thread, recording each outcome."""
+
+    _DONE = object()
+
+    def __init__(self, processor: DocumentProcessor, manager: ChromaDBManager, checkpoint_path: str,
+                 report_path: str = None, workers: int = 2, queue_size: int = 2, profile: str = None):
+        self.processor = processor.with_profile(profile)
+        self.manager = manager
+        self.profile = profile
+        self.workers = max(1, workers)
+        self.checkpoint_path = checkpoint_path
+        self.done = load_checkpoint(checkpoint_path)
+        self.report_path = report_path
+        # Paths for the workers, and converted documents for the store thread.
+        self.paths = queue.Queue(maxsize=self.workers * 2)
+        self.converted = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._seen = set()
+        self.counts = {INGESTED: 0, SKIPPED: 0, DUPLICATE: 0, FAILED: 0}
+        self.pages = 0
+        self.started = None
+
+    def claim(self, file_hash: str) -> str:
+        """None when the file should be ingested, otherwise why it's skipped."""
+        with self._lock:
+            if file_hash in self.done:
+                return SKIPPED
+            if file_hash in self._seen:
+                # The same bytes under another path in this run.
+                return DUPLICATE
+            self._seen.add(file_hash)
+            return None
+
+    def record(self, result: Dict):
+        with self._lock:
+            self.counts[result["status"]] += 1
+            if result["status"] == INGESTED:
+                self.pages += result.get("pages", 0)
+                self.done.add(result["file_hash"])
+                with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                    f.write(result["file_hash"] + "\n")
+            elif result["status"] == FAILED:
+                # A later copy of the same bytes gets another try.
+                self._seen.discard(result.get("file_hash"))
+            if self.report_path:
+                with open(self.report_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result) + "\n")
+            finished = sum(self.counts.values())
+            detail = f"{result.get('pages', 0)} pages" if result["status"] == INGESTED else result.get("error", "")
+            print(f"[{finished}] {result['status']:<9} {result['path']}  {detail}", flush=True)
+
+    def _worker(self):
+        while True:
+            path = self.paths.get()
+            if path is self._DONE:
+                return
+            result = {"path": path, "profile": self.profile}
+            try:
+                result["file_hash"] = ConversionCache.file_digest(path)
+                status = self.claim(result["file_hash"])
+                if status is not None:
+                    self.record(dict(result, status=status))
+                    continue
+
+                start = time.perf_counter()
+                if self.processor.should_stream(path):
+                    # Windows are converted as the store consumes them, so large PDFs are stored from this thread.
+                    doc_id, document_data = ingest_file(self.processor, self.manager, path)
+                    result["seconds"] = time.perf_counter() - start
+                    self.record(self.summarize(result, doc_id, document_data))
+                    continue
+
+                document_data = self.processor.extract_text_from_file(path)
+                result["convert_seconds"] = time.perf_counter() - start
+                self.converted.put((result, document_data))
+            except Exception as e:
+                traceback.print_exc()
+                self.record(dict(result, status=FAILED, error=str(e)))
+
+    def _store(self):
+        while True:
+            item = self.converted.get()
+            if item is self._DONE:
+                return
+            result, document_data = item
+            try:
+                start = time.perf_counter()
+                doc_id = self.manager.add_document(document_data)
+                result["store_seconds"] = time.perf_counter() - start
+                self.record(self.summarize(result, doc_id, document_data))
+            except Exception as e:
+                traceback.print_exc()
+                self.record(dict(result, status=FAILED, error=str(e)))
+
+    @staticmethod
+    def summarize(result: Dict, doc_id: str, document_data: Dict) -> Dict:
+        return dict(
+            result,
+            status=INGESTED,
+            doc_id=doc_id,
+            pages=document_data["page_count"],
+            ocr_pages=document_data.get("ocr_pages", 0),
+            word_count=document_data.get("word_count", 0),
+            table_count=document_data.get("table_count", 0),
+            streamed=document_data.get("streamed", False),
+            cache_hit=document_data.get("cache_hit", False),
+        )
+
+    def run(self, paths: Iterator[str]) -> Dict:
+        self.started = time.perf_counter()
+        workers = [threading.Thread(target=self._worker, name=f"convert-{i}", daemon=True) for i in range(self.workers)]
+        store = threading.Thread(target=self._store, name="store", daemon=True)
+        for thread in workers + [store]:
+            thread.start()
+
+        for path in paths:
+            self.paths.put(path)
+        for _ in workers:
+            self.paths.put(self._DONE)
+        for thread in workers:
+            thread.join()
+        self.converted.put(self._DONE)
+        store.join()
+        return self.throughput()
+
+    def throughput(self) -> Dict:
+        with self._lock:
+            seconds = time.perf_counter() - self.started if self.started else 0.0
+            return dict(
+                self.counts,
+                pages=self.pages,
+                seconds=seconds,
+                files_per_min=self.counts[INGESTED] * 60 / seconds if seconds else 0.0,
+                pages_per_sec=self.pages / seconds if seconds else 0.0,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="files or directories to ingest")
+    parser.add_argument("--manifest", help="text file listing one path per line")
+    parser.add_argument("--collection", required=True, help="collection (or shared-collection namespace) to ingest into")
+    parser.add_argument("--profile", choices=list(PROFILES), help=f"OCR profile (default: OCR_PROFILE, {env_data.OCR_PROFILE})")
+    parser.add_argument("--workers", type=int, default=env_data.INGEST_CONCURRENCY, help="conversion threads")
+    parser.add_argument("--queue-size", type=int, default=None, help="converted documents waiting for the store (default: --workers)")
+    parser.add_argument("--checkpoint", help="file of ingested hashes (default: CACHE_DIR/ingest_<collection>.checkpoint)")
+    parser.add_argument("--report", help="append one JSON line per file here")
+    args = parser.parse_args()
+
+    inputs = list(args.inputs)
+    if args.manifest:
+        inputs += read_manifest(args.manifest)
+    if not inputs:
+        parser.error("give files, directories or --manifest")
+
+    checkpoint = args.checkpoint or os.path.join(env_data.CACHE_DIR, f"ingest_{args.collection}.checkpoint")
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint)), exist_ok=True)
+
+    # A bulk corpus isn't session data: its own pool keeps it out of the sidecar the app's reaper works from.
+    manager = ChromaDBManager(collection_name=args.collection, pool=CollectionPool())
+    processor = DocumentProcessor()
+    # The conversion threads share this process's converters and cores.
+    processor.registry.concurrency = args.workers
+    batch = BatchIngest(
+        processor, manager, checkpoint, report_path=args.report, workers=args.workers,
+        queue_size=args.queue_size or args.workers, profile=args.profile
+    )
+    if batch.done:
+        print(f"resuming: {len(batch.done)} file(s) already in {checkpoint}")
+
+    try:
+        summary = batch.run(iter_paths(inputs))
+    except KeyboardInterrupt:
+        summary = batch.throughput()
+        print("\ninterrupted; rerun with the same --checkpoint to resume")
+
+    print(f"{summary[INGESTED]} ingested, {summary[SKIPPED]} skipped, {summary[DUPLICATE]} duplicate, "
+          f"{summary[FAILED]} failed in {summary['seconds']:.1f}s")
+    print(f"{summary['files_per_min']:.1f} files/min, {summary['pages_per_sec']:.2f} pages/sec")
+    if summary[FAILED]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
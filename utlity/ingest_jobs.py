@@ -0,0 +1,303 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import UniqueConstraint, event, inspect, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Field, Session, SQLModel, create_engine, delete, func, select
+from utlity.env_load import env_data
+from utlity.bm25_index import check_collection_name
+from utlity.tracing import tracer
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ACTIVE = (QUEUED, RUNNING)
+
+# Extraction results kept on the job for the UI's processing details.
+RESULT_KEYS = (
+    "word_count", "page_count", "ocr_pages", "text_layer_pages", "has_tables", "has_images",
+    "table_count", "processing_method", "cache_hit"
+)
+
+
+class IngestJob(SQLModel, table=True):
+    # One job per file content per collection; resubmitting the same bytes is rejected.
+    __table_args__ = (UniqueConstraint("collection_name", "file_hash"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_id: str = Field(index=True)
+    collection_name: str
+    filename: str
+    file_hash: str
+    path: str
+    # OCR profile for this file; None uses the deployment's OCR_PROFILE.
+    profile: Optional[str] = None
+    status: str = Field(default=QUEUED, index=True)
+    pages_done: int = 0
+    pages_total: int = 0
+    doc_id: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def eta(self) -> Optional[float]:
+        """Seconds left for a running job, extrapolated from the pages converted so far."""
+        if self.status != RUNNING or not self.started_at or not self.pages_done or not self.pages_total:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.pages_done * (self.pages_total - self.pages_done)
+
+    def details(self) -> Dict:
+        return json.loads(self.result) if self.result else {}
+
+
+class JobQueue:
+    """SQLite-backed ingestion queue shared by the UI and the ingestion workers.
+
+    Uploaded bytes are copied under ``upload_dir`` so jobs outlive the
+    Streamlit request (and the browser tab) that submitted them.
+    """
+
+    def __init__(self, db_path: str, upload_dir: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.upload_dir = upload_dir
+        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False, "timeout": 30})
+        event.listen(self.engine, "connect", self._configure_connection)
+        SQLModel.metadata.create_all(self.engine, tables=[IngestJob.__table__])
+        self._migrate()
+        self.submitted = threading.Event()
+
+    def _migrate(self):
+        # create_all never alters an existing table; add columns introduced since it was created.
+        columns = {column["name"] for column in inspect(self.engine).get_columns(IngestJob.__tablename__)}
+        with self.engine.begin() as connection:
+            if "profile" not in columns:
+                connection.execute(text(f"ALTER TABLE {IngestJob.__tablename__} ADD COLUMN profile VARCHAR"))
+
+    @staticmethod
+    def _configure_connection(connection, _):
+        # WAL lets the UI read job state while a worker is writing progress.
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+
+    def _session(self) -> Session:
+        return Session(self.engine, expire_on_commit=False)
+
+    def submit(self, session_id: str, collection_name: str, filename: str, data: bytes,
+               profile: str = None) -> Tuple[IngestJob, bool]:
+        """Queue a file; returns (job, created). Content already queued, running or ingested is not queued again."""
+        file_hash = hashlib.sha256(data).hexdigest()
+        with self._session() as session:
+            job = session.exec(
+                select(IngestJob).where(IngestJob.collection_name == collection_name, IngestJob.file_hash == file_hash)
+            ).first()
+            if job is not None and job.status != FAILED:
+                return job, False
+
+            # Per collection, so sessions uploading the same file each own (and remove) their copy.
+            path = os.path.join(self.upload_dir, check_collection_name(collection_name), file_hash, os.path.basename(filename))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+            if job is None:
+                job = IngestJob(session_id=session_id, collection_name=collection_name, filename=filename,
+                                file_hash=file_hash, path=path, profile=profile)
+            else:
+                # A failed job is retried in place.
+                job.sqlmodel_update({
+                    "session_id": session_id, "filename": filename, "path": path, "profile": profile, "status": QUEUED,
+                    "pages_done": 0, "pages_total": 0, "error": None, "created_at": time.time(),
+                    "started_at": None, "finished_at": None
+                })
+            session.add(job)
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another submission of the same file won the race.
+                session.rollback()
+                job = session.exec(
+                    select(IngestJob).where(IngestJob.collection_name == collection_name, IngestJob.file_hash == file_hash)
+                ).one()
+                return job, False
+            session.refresh(job)
+
+        self.submitted.set()
+        return job, True
+
+    def claim(self) -> Optional[IngestJob]:
+        """Mark the oldest queued job as running and return it, or None when the queue is empty."""
+        with self._session() as session:
+            while True:
+                job = session.exec(
+                    select(IngestJob).where(IngestJob.status == QUEUED).order_by(IngestJob.id).limit(1)
+                ).first()
+                if job is None:
+                    return None
+                # Conditional update so two workers never take the same job.
+                claimed = session.execute(
+                    update(IngestJob)
+                    .where(IngestJob.id == job.id, IngestJob.status == QUEUED)
+                    .values(status=RUNNING, started_at=time.time())
+                ).rowcount
+                session.commit()
+                if claimed:
+                    session.refresh(job)
+                    return job
+
+    def _update(self, job_id: int, **values):
+        with self._session() as session:
+            session.execute(update(IngestJob).where(IngestJob.id == job_id).values(**values))
+            session.commit()
+
+    def progress(self, job_id: int, pages_done: int, pages_total: int):
+        self._update(job_id, pages_done=pages_done, pages_total=pages_total)
+
+    def finish(self, job_id: int, doc_id: str, result: Dict):
+        self._update(job_id, status=DONE, doc_id=doc_id, result=json.dumps(result), finished_at=time.time())
+
+    def fail(self, job_id: int, error: str):
+        self._update(job_id, status=FAILED, error=error, finished_at=time.time())
+
+    def requeue_running(self) -> int:
+        """Put jobs left running by a previous process back in the queue."""
+        with self._session() as session:
+            count = session.execute(
+                update(IngestJob).where(IngestJob.status == RUNNING).values(status=QUEUED, started_at=None, pages_done=0)
+            ).rowcount
+            session.commit()
+        if count:
+            self.submitted.set()
+        return count
+
+    def get(self, job_id: int) -> Optional[IngestJob]:
+        with self._session() as session:
+            return session.get(IngestJob, job_id)
+
+    def jobs(self, session_id: str, limit: int = 50) -> List[IngestJob]:
+        with self._session() as session:
+            return list(session.exec(
+                select(IngestJob).where(IngestJob.session_id == session_id).order_by(IngestJob.id.desc()).limit(limit)
+            ))
+
+    def active_count(self, session_id: str) -> int:
+        with self._session() as session:
+            return session.exec(
+                select(func.count()).select_from(IngestJob)
+                .where(IngestJob.session_id == session_id, IngestJob.status.in_(ACTIVE))
+            ).one()
+
+    def remove_upload(self, job: IngestJob):
+        shutil.rmtree(os.path.dirname(job.path), ignore_errors=True)
+        try:
+            # The collection's directory goes once its last upload does.
+            os.rmdir(os.path.dirname(os.path.dirname(job.path)))
+        except OSError:
+            pass
+
+    def clear(self, collection_name: str):
+        with self._session() as session:
+            session.exec(delete(IngestJob).where(IngestJob.collection_name == collection_name))
+            session.commit()
+
+
+class IngestRunner:
+    """Background threads that drain a JobQueue into the vector store.
+
+    One runner per server process: started jobs are requeued on start-up,
+    so a crash or restart never leaves a job stuck in "running".
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = None, processor=None):
+        self.queue = queue
+        self.workers = workers or env_data.INGEST_CONCURRENCY
+        self._processor = processor
+        self._managers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def processor(self):
+        with self._lock:
+            if self._processor is None:
+                from utlity.documnet_proesser import DocumentProcessor
+                self._processor = DocumentProcessor()
+            return self._processor
+
+    def manager(self, collection_name: str):
+        with self._lock:
+            manager = self._managers.get(collection_name)
+            if manager is None:
+                from utlity.chromadb import ChromaDBManager
+                manager = self._managers[collection_name] = ChromaDBManager(collection_name=collection_name)
+            return manager
+
+    def start(self):
+        # The worker threads convert side by side on one registry, so each converter gets its share of the cores.
+        self.processor.registry.concurrency = self.workers
+        self.queue.requeue_running()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"ingest-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self.queue.submitted.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.queue.submitted.wait(timeout=1.0)
+                self.queue.submitted.clear()
+                continue
+            self.run(job)
+
+    def run(self, job: IngestJob):
+        def progress(pages_done: int, pages_total: int):
+            self.queue.progress(job.id, pages_done, pages_total)
+
+        try:
+            from utlity.llm import ingest_file
+
+            with tracer.span("ingest", filename=job.filename, job_id=job.id, profile=job.profile,
+                             collection=job.collection_name):
+                doc_id, document_data = ingest_file(
+                    self.processor, self.manager(job.collection_name), job.path, progress=progress, profile=job.profile
+                )
+            self.queue.finish(job.id, doc_id, {key: document_data[key] for key in RESULT_KEYS if key in document_data})
+        except Exception as e:
+            traceback.print_exc()
+            self.queue.fail(job.id, str(e))
+        finally:
+            self.queue.remove_upload(job)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(os.path.join(env_data.CACHE_DIR, "jobs.sqlite"), os.path.join(env_data.CACHE_DIR, "uploads"))
+        return _queue
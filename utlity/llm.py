@@ -1,22 +1,58 @@
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from typing import List, Dict
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Optional, Tuple
+import asyncio
+import os
+import contextvars
+import time
+import weakref
 from utlity.chromadb import ChromaDBManager
 from utlity.documnet_proesser import DocumentProcessor
+from utlity.model_registry import ModelRegistry, model_registry
+from utlity.answer_cache import AnswerCache
+from utlity.context_packer import pack_context
+from utlity.tracing import tracer, breakdown
+from utlity.env_load import env_data
 
 
+GENERATION_ERROR_PREFIX = "Sorry, I encountered an error while generating the answer"
 
 
 
 
+
+
+@dataclass
+class GenerationMetrics:
+    time_to_first_token: Optional[float] = None
+    total_time: Optional[float] = None
+    chunks: int = 0
+
+    def as_dict(self) -> Dict:
+        return {"time_to_first_token": self.time_to_first_token, "total_time": self.total_time, "chunks": self.chunks}
+
+
+def message_text(message) -> str:
+    content = message.content if hasattr(message, "content") else message
+    if isinstance(content, list):
+        # Gemini can return content as a list of parts.
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return str(content)
+
+
 class GeminiQAAgent:
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, llm=None):
+        # LangChain is only imported once an agent is built, not when this module is.
+        from langchain_core.prompts import ChatPromptTemplate
 
-      
         self.api_key = api_key
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=api_key)
+        if llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=api_key)
+        self.llm = llm
+        self.last_metrics = GenerationMetrics()
         self.prompt_template = ChatPromptTemplate.from_template(
             """
             You are an intelligent document analysis assistant. 
@@ -33,8 +69,8 @@ class GeminiQAAgent:
             6.Maintain a helpful and professional tone\n- If there are multiple perspectives in the documents, present them fairly
             {source_info}"""
         )
-    def generate_answer(self, question: str, context: str, metadata: List[Dict] = None) -> str:
-        """Generate answer using Gemini via LangChain with context and metadata"""
+
+    def build_prompt(self, question: str, context: str, metadata: List[Dict] = None):
         # Prepare metadata information
         source_info = ""
         if metadata:
@@ -48,32 +84,121 @@ class GeminiQAAgent:
                 sources.append(source_detail)
             source_info = f"\n\nSources:\n" + "\n".join(set(sources))
 
-        prompt = self.prompt_template.format_messages(
+        return self.prompt_template.format_messages(
             context=context,
             question=question,
             source_info=source_info
         )
+
+    def generate_answer(self, question: str, context: str, metadata: List[Dict] = None) -> str:
+        """Generate answer using Gemini via LangChain with context and metadata"""
+        prompt = self.build_prompt(question, context, metadata)
+        metrics = self.last_metrics = GenerationMetrics()
+        start = time.perf_counter()
+        with tracer.span("llm.generate"):
+            try:
+                response = self.llm.invoke(prompt)
+                # Without streaming the first token arrives with the whole answer.
+                metrics.total_time = metrics.time_to_first_token = time.perf_counter() - start
+                metrics.chunks = 1
+                return message_text(response)
+            except Exception as e:
+                return f"{GENERATION_ERROR_PREFIX}: {e}"
+
+    def stream_answer(self, question: str, context: str, metadata: List[Dict] = None) -> Iterator[str]:
+        """Yield the answer text as the model streams it, recording TTFT and total time in last_metrics."""
+        prompt = self.build_prompt(question, context, metadata)
+        metrics = self.last_metrics = GenerationMetrics()
+        start = time.perf_counter()
+        try:
+            for message in self.llm.stream(prompt):
+                text = message_text(message)
+                if not text:
+                    continue
+                if metrics.time_to_first_token is None:
+                    metrics.time_to_first_token = time.perf_counter() - start
+                metrics.chunks += 1
+                yield text
+        except Exception as e:
+            yield f"{GENERATION_ERROR_PREFIX}: {e}"
+        finally:
+            metrics.total_time = time.perf_counter() - start
+            # Recorded after the fact: a span held open across yields would leak into the caller's context.
+            tracer.record("llm.stream", metrics.total_time, time_to_first_token=metrics.time_to_first_token, chunks=metrics.chunks)
+
+    async def agenerate_answer(self, question: str, context: str, metadata: List[Dict] = None) -> Tuple[str, GenerationMetrics]:
+        """Async generate_answer; returns the metrics too since concurrent calls would race on last_metrics."""
+        prompt = self.build_prompt(question, context, metadata)
+        metrics = GenerationMetrics()
+        start = time.perf_counter()
+        with tracer.span("llm.generate"):
+            try:
+                response = await self.llm.ainvoke(prompt)
+                metrics.total_time = metrics.time_to_first_token = time.perf_counter() - start
+                metrics.chunks = 1
+                return message_text(response), metrics
+            except Exception as e:
+                return f"{GENERATION_ERROR_PREFIX}: {e}", metrics
+
+    async def astream_answer(self, question: str, context: str, metadata: List[Dict] = None,
+                             metrics: GenerationMetrics = None) -> AsyncIterator[str]:
+        prompt = self.build_prompt(question, context, metadata)
+        metrics = metrics if metrics is not None else GenerationMetrics()
+        start = time.perf_counter()
         try:
-            response = self.llm.invoke(prompt)
-            return response.content if hasattr(response, "content") else str(response)
+            async for message in self.llm.astream(prompt):
+                text = message_text(message)
+                if not text:
+                    continue
+                if metrics.time_to_first_token is None:
+                    metrics.time_to_first_token = time.perf_counter() - start
+                metrics.chunks += 1
+                yield text
         except Exception as e:
-            return f"Sorry, I encountered an error while generating the answer: {e}"
+            yield f"{GENERATION_ERROR_PREFIX}: {e}"
+        finally:
+            metrics.total_time = time.perf_counter() - start
+            tracer.record("llm.stream", metrics.total_time, time_to_first_token=metrics.time_to_first_token, chunks=metrics.chunks)
+
+def ingest_file(processor: DocumentProcessor, manager: ChromaDBManager, filepath: str,
+                progress: Callable[[int, int], None] = None, profile: str = None) -> Tuple[str, Dict]:
+    """Convert and store one file; returns (doc_id, document metadata).
+
+    Large PDFs (DocumentProcessor.should_stream) go through in page windows, so
+    only one window's pages and text are held at a time. ``profile`` names an
+    OCR profile for this file instead of the deployment's OCR_PROFILE.
+    """
+    processor = processor.with_profile(profile)
+    if processor.should_stream(filepath):
+        document_data, windows = processor.stream_text_from_file(filepath, progress=progress)
+        return manager.add_document_stream(document_data, windows), document_data
+
+    document_data = processor.extract_text_from_file(filepath, progress=progress)
+    return manager.add_document(document_data), document_data
+
 
 class DocumentQASystem:
 
     
-    def __init__(self, gemini_api_key: str, collection_name:str):
-        self.processor = DocumentProcessor()
+    def __init__(self, gemini_api_key: str, collection_name:str, registry: ModelRegistry = model_registry, llm=None):
+        self.processor = DocumentProcessor(registry=registry)
         self.db_manager = ChromaDBManager(collection_name=f"col{collection_name}")
-        self.qa_agent = GeminiQAAgent(gemini_api_key)
+        self.qa_agent = GeminiQAAgent(gemini_api_key, llm=llm)
+        self.answer_cache = AnswerCache(
+            max_entries=env_data.ANSWER_CACHE_SIZE,
+            ttl_seconds=env_data.ANSWER_CACHE_TTL,
+            similarity_threshold=env_data.ANSWER_CACHE_THRESHOLD
+        )
+        self.ingest_concurrency = env_data.INGEST_CONCURRENCY
+        self._executor = None
+        # asyncio.Semaphore binds to the loop it is first used on, and every asyncio.run() is a new loop.
+        self._ingest_semaphores = weakref.WeakKeyDictionary()
     
-    def process_and_store_document(self, filepath: str):
+    def process_and_store_document(self, filepath: str, progress: Callable[[int, int], None] = None, profile: str = None):
         try:
-            # Extract text and metadata using Docling
-            document_data = self.processor.extract_text_from_file(filepath)
-            
-            # Store in ChromaDB
-            doc_id = self.db_manager.add_document(document_data)
+            with tracer.span("ingest", filename=os.path.basename(filepath), profile=profile,
+                             collection=self.db_manager.collection_name):
+                doc_id, document_data = ingest_file(self.processor, self.db_manager, filepath, progress=progress, profile=profile)
             
             return {
                 "success": True,
@@ -88,57 +213,241 @@ class DocumentQASystem:
                 "error": str(e)
             }
     
+    def prepare_answer(self, question: str) -> Dict:
+        """Retrieve the context for a question.
+
+        Returns {"response": ...} when no generation is needed (cache hit or
+        no documents), otherwise the inputs for generation and finish_answer.
+        """
+        with tracer.span("query.embed"):
+            question_vector = self.db_manager.embedder.embed_query(question)
+        content_version = self.db_manager.content_version
+        with tracer.span("query.cache_lookup") as span:
+            cached = self.answer_cache.get(content_version, question, question_vector)
+            span.set(hit=cached is not None)
+        if cached is not None:
+            cached["cached"] = True
+            return {"response": cached}
+
+        with tracer.span("query.search"):
+            search_results = self.db_manager.search_documents(
+                question,
+                n_results=env_data.CONTEXT_CHUNKS * env_data.CONTEXT_OVERFETCH,
+                query_embedding=question_vector,
+                include=['documents', 'metadatas', 'distances', 'embeddings']
+            )
+            search_results = self.db_manager.expand_table_hits(search_results, question)
+        
+        if not search_results["documents"] or not search_results["documents"][0]:
+            return {"response": {
+                "answer": "I don't have any relevant documents to answer your question. Please upload some documents first.",
+                "sources": [],
+                "confidence": 0.0
+            }}
+
+        with tracer.span("query.pack_context") as span:
+            packed = pack_context(
+                question_vector,
+                search_results,
+                k=env_data.CONTEXT_CHUNKS,
+                token_budget=env_data.CONTEXT_TOKEN_BUDGET,
+                lambda_=env_data.MMR_LAMBDA
+            )
+            span.set(**packed.stats)
+
+        sources = []
+        confidence_scores = []
+        
+        for metadata, distance in zip(packed.metadatas, packed.distances):
+            source_info = {
+                "filename": metadata.get("filename", "Unknown"),
+                "processing_method": metadata.get("processing_method", "Unknown"),
+                "has_tables": metadata.get("has_tables", False),
+                "has_images": metadata.get("has_images", False),
+                "page_count": metadata.get("page_count", 1)
+            }
+            if "page_start" in metadata:
+                source_info["pages"] = (metadata["page_start"], metadata["page_end"])
+
+            source_info["relevance_score"] = 1 - distance
+            confidence_scores.append(source_info["relevance_score"])
+            
+            sources.append(source_info)
+        
+        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0.5
+
+        return {
+            "question_vector": question_vector,
+            "content_version": content_version,
+            "context": packed.context,
+            "context_stats": packed.stats,
+            "metadatas": packed.metadatas,
+            "sources": sources,
+            "confidence": avg_confidence
+        }
+
+    def finish_answer(self, question: str, prepared: Dict, answer: str, metrics: GenerationMetrics = None) -> Dict:
+        metrics = metrics if metrics is not None else self.qa_agent.last_metrics
+        response = {
+            "answer": answer,
+            "sources": prepared["sources"],
+            "context": prepared["context"],
+            "confidence": prepared["confidence"],
+            "context_stats": prepared["context_stats"],
+            "metrics": metrics.as_dict()
+        }
+        if not answer.startswith(GENERATION_ERROR_PREFIX):
+            self.answer_cache.put(prepared["content_version"], question, prepared["question_vector"], response)
+        return response
+    
     def answer_question(self, question: str):
         try:
-            search_results = self.db_manager.search_documents(question, n_results=8)
-            
-            if not search_results["documents"]:
-                return {
-                    "answer": "I don't have any relevant documents to answer your question. Please upload some documents first.",
-                    "sources": [],
-                    "confidence": 0.0
-                }
-            
-            context = "\n\n".join(search_results["documents"][0])
-            
-            answer = self.qa_agent.generate_answer(question, context, search_results["metadatas"][0])
+            with tracer.span("question"):
+                prepared = self.prepare_answer(question)
+                if "response" in prepared:
+                    return prepared["response"]
 
-            sources = []
-            confidence_scores = []
-            
-            if search_results["metadatas"]:
-                for i, metadata in enumerate(search_results["metadatas"][0]):
-                    source_info = {
-                        "filename": metadata.get("filename", "Unknown"),
-                        "processing_method": metadata.get("processing_method", "Unknown"),
-                        "has_tables": metadata.get("has_tables", False),
-                        "has_images": metadata.get("has_images", False),
-                        "page_count": metadata.get("page_count", 1)
-                    }
-                    
-                    if search_results.get("distances") and i < len(search_results["distances"][0]):
-                        source_info["relevance_score"] = 1 - search_results["distances"][0][i]
-                        confidence_scores.append(source_info["relevance_score"])
-                    
-                    sources.append(source_info)
-            
-            avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0.5
-            
+                answer = self.qa_agent.generate_answer(question, prepared["context"], prepared["metadatas"])
+                return self.finish_answer(question, prepared, answer)
+        except Exception as e:
             return {
-                "answer": answer,
-                "sources": sources,
-                "context": context,
-                "confidence": avg_confidence
+                "answer": f"Sorry, I encountered an error: {e}",
+                "sources": [],
+                "confidence": 0.0
             }
+
+    def stream_answer(self, question: str) -> Dict:
+        """Like answer_question, but response["stream"] yields the answer as it is generated.
+
+        "answer" and "metrics" are filled in once the stream is exhausted.
+        """
+        try:
+            # Generation is traced separately ("llm.stream") once the caller drains the stream.
+            with tracer.span("question", streaming=True):
+                prepared = self.prepare_answer(question)
+        except Exception as e:
+            prepared = {"response": {
+                "answer": f"Sorry, I encountered an error: {e}",
+                "sources": [],
+                "confidence": 0.0
+            }}
+
+        if "response" in prepared:
+            response = prepared["response"]
+            response["stream"] = iter([response["answer"]])
+            return response
+
+        response = {
+            "sources": prepared["sources"],
+            "context": prepared["context"],
+            "confidence": prepared["confidence"]
+        }
+
+        def stream():
+            parts = []
+            for text in self.qa_agent.stream_answer(question, prepared["context"], prepared["metadatas"]):
+                parts.append(text)
+                yield text
+            response.update(self.finish_answer(question, prepared, "".join(parts)))
+
+        response["stream"] = stream()
+        return response
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.ingest_concurrency, thread_name_prefix="ingest")
+        return self._executor
+
+    def _ingest_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._ingest_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._ingest_semaphores[loop] = asyncio.Semaphore(self.ingest_concurrency)
+        return semaphore
+
+    async def aprocess_and_store_document(self, filepath: str, profile: str = None):
+        async with self._ingest_semaphore():
+            try:
+                loop = asyncio.get_running_loop()
+                processor = self.processor.with_profile(profile)
+                # Conversion is CPU-bound: run it on the ingest pool so the event loop keeps serving questions.
+                with tracer.span("ingest", filename=os.path.basename(filepath), profile=profile,
+                                 collection=self.db_manager.collection_name):
+                    # run_in_executor doesn't copy the context like to_thread does; carry the span over explicitly.
+                    if processor.should_stream(filepath):
+                        # Conversion and upload are interleaved window by window, so both run on the ingest pool.
+                        doc_id, document_data = await loop.run_in_executor(
+                            self.executor, contextvars.copy_context().run, ingest_file, processor, self.db_manager, filepath
+                        )
+                    else:
+                        document_data = await loop.run_in_executor(
+                            self.executor, contextvars.copy_context().run, processor.extract_text_from_file, filepath
+                        )
+                        doc_id = await asyncio.to_thread(self.db_manager.add_document, document_data)
+                return {
+                    "success": True,
+                    "doc_id": doc_id,
+                    "metadata": document_data
+                }
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                return {
+                    "success": False,
+                    "error": str(e)
+                }
+
+    async def aprocess_many(self, filepaths: List[str], profile: str = None) -> List[Dict]:
+        """Ingest several files concurrently, at most ingest_concurrency at a time."""
+        return await asyncio.gather(*(self.aprocess_and_store_document(filepath, profile) for filepath in filepaths))
+
+    async def aanswer_question(self, question: str):
+        try:
+            with tracer.span("question"):
+                prepared = await asyncio.to_thread(self.prepare_answer, question)
+                if "response" in prepared:
+                    return prepared["response"]
+
+                answer, metrics = await self.qa_agent.agenerate_answer(question, prepared["context"], prepared["metadatas"])
+                return self.finish_answer(question, prepared, answer, metrics)
         except Exception as e:
             return {
                 "answer": f"Sorry, I encountered an error: {e}",
                 "sources": [],
                 "confidence": 0.0
             }
-    
+
+    async def aget_system_stats(self):
+        return await asyncio.to_thread(self.get_system_stats)
+
     def get_system_stats(self):
         return self.db_manager.get_document_stats()
+
+    def get_cache_stats(self):
+        return self.answer_cache.stats()
+
+    def delete_document(self, doc_id: str):
+        self.db_manager.delete_document(doc_id)
+
+    def get_model_stats(self):
+        return self.processor.registry.stats()
+
+    def get_timing_breakdowns(self, limit: int = 5) -> List[Dict]:
+        """Per-stage seconds for this collection's most recent traced uploads, newest first."""
+        # The tracer is shared by every session in the process; only this collection's uploads are shown.
+        traces = [
+            trace for trace in tracer.recent("ingest")
+            if trace["attrs"].get("collection") == self.db_manager.collection_name
+        ]
+        return [
+            {
+                "filename": trace["attrs"].get("filename"),
+                "total": trace["duration"],
+                "stages": breakdown(trace)
+            }
+            for trace in reversed(traces[-limit:])
+        ]
     
     def clear_system(self, collection_name:str):
         self.db_manager.clear_collection(collection_name=collection_name)
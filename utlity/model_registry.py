@@ -0,0 +1,232 @@
+from utlity.tracing import tracer
+from utlity.env_load import env_data
+from dataclasses import dataclass, asdict, fields, replace
+from typing import Dict, List
+import threading
+import hashlib
+import json
+import os
+import sys
+
+# Docling and huggingface_hub are imported where they are used: importing this module
+# (and everything that imports it) must stay cheap until a document actually arrives.
+
+
+RAPIDOCR_REPO = "SWHL/RapidOCR"
+
+
+# Thread settings change speed, not output, so they stay out of the fingerprint (and the conversion cache key).
+RUNTIME_FIELDS = ("intra_op_threads", "inter_op_threads")
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    det_model: str = "PP-OCRv4/en_PP-OCRv3_det_infer.onnx"
+    rec_model: str = "PP-OCRv4/ch_PP-OCRv4_rec_server_infer.onnx"
+    cls_model: str = "PP-OCRv3/ch_ppocr_mobile_v2.0_cls_train.onnx"
+    # The text-line angle classifier only matters for rotated or upside-down scans.
+    use_cls: bool = True
+    do_ocr: bool = True
+    do_table_structure: bool = True
+    do_cell_matching: bool = True
+    table_mode: str = "accurate"
+    images_scale: float = 5.0
+    skip_text_layer_pages: bool = True
+    # Images are cleaned up before OCR, which changes the output, so it's part of the fingerprint.
+    image_preprocess: bool = env_data.IMAGE_PREPROCESS
+    # 0: the host's cores split evenly between the converters running at once (OCR_THREADS overrides).
+    intra_op_threads: int = 0
+    inter_op_threads: int = 1
+
+    def text_layer_variant(self) -> "PipelineConfig":
+        # Born-digital pages keep their embedded text; tables still need a modest page image.
+        return replace(self, do_ocr=False, images_scale=min(self.images_scale, 2.0))
+
+    def fingerprint(self) -> str:
+        # Model files are identified by their repo-relative path, so this never touches the hub.
+        payload = json.dumps({k: v for k, v in asdict(self).items() if k not in RUNTIME_FIELDS}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def threads(self, concurrency: int = 1) -> int:
+        if self.intra_op_threads:
+            return self.intra_op_threads
+        if env_data.OCR_THREADS:
+            return env_data.OCR_THREADS
+        return max(1, (os.cpu_count() or 1) // max(1, concurrency))
+
+
+# Named trade-offs between speed and recognition quality, selectable per deployment
+# (OCR_PROFILE) or per document. "accurate" is the original configuration.
+PROFILES: Dict[str, PipelineConfig] = {
+    "fast": PipelineConfig(
+        rec_model="PP-OCRv4/ch_PP-OCRv4_rec_infer.onnx",
+        use_cls=False,
+        do_cell_matching=False,
+        table_mode="fast",
+        images_scale=2.0,
+    ),
+    "balanced": PipelineConfig(
+        rec_model="PP-OCRv4/ch_PP-OCRv4_rec_infer.onnx",
+        images_scale=3.0,
+    ),
+    "accurate": PipelineConfig(),
+}
+
+
+def pipeline_profile(name: str) -> PipelineConfig:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown OCR profile '{name}', expected one of {', '.join(PROFILES)}") from None
+
+
+DEFAULT_PIPELINE = pipeline_profile(env_data.OCR_PROFILE)
+
+
+class ModelRegistry:
+    """Process-wide owner of the OCR models and Docling converters.
+
+    Converters are built once per PipelineConfig and shared by every
+    DocumentProcessor in the process, so Streamlit reruns and new sessions
+    never reload the ONNX sessions or the layout/table models.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._model_dir = None
+        self._converters = {}
+        self._embedding_models = {}
+        # Converters running at once on this host (worker processes, or ingest_cli threads); they share its cores.
+        self.concurrency = 1
+        self.load_counts = {"model_download": 0, "converter": 0, "pipeline": 0, "embedding_model": 0}
+
+    def model_dir(self) -> str:
+        """Directory holding the RapidOCR ONNX files.
+
+        OCR_MODEL_DIR (pre-populated, see ``python -m utlity.model_registry``)
+        is used as-is without contacting the hub. Otherwise the local
+        Hugging Face cache is tried first and the hub only on a miss.
+        """
+        with self._lock:
+            if self._model_dir is None:
+                if env_data.OCR_MODEL_DIR:
+                    self._model_dir = env_data.OCR_MODEL_DIR
+                else:
+                    from huggingface_hub import snapshot_download
+                    try:
+                        self._model_dir = snapshot_download(repo_id=RAPIDOCR_REPO, local_files_only=True)
+                    except Exception:
+                        self._model_dir = snapshot_download(repo_id=RAPIDOCR_REPO)
+                        self.load_counts["model_download"] += 1
+            return self._model_dir
+
+    def model_path(self, relative_path: str) -> str:
+        path = os.path.join(self.model_dir(), *relative_path.split("/"))
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"OCR model '{relative_path}' not found in {self.model_dir()}; "
+                f"populate it with: python -m utlity.model_registry {self.model_dir()}"
+            )
+        return path
+
+    def build_pipeline_options(self, config: PipelineConfig = DEFAULT_PIPELINE):
+        from docling.datamodel.pipeline_options import AcceleratorDevice, AcceleratorOptions, PdfPipelineOptions, RapidOcrOptions
+
+        pipeline_options = PdfPipelineOptions()
+        # Docling hands num_threads to RapidOCR as the ONNX Runtime intra-op thread count
+        # (and to torch for the layout and table models).
+        pipeline_options.accelerator_options = AcceleratorOptions(num_threads=config.threads(self.concurrency), device=AcceleratorDevice.CPU)
+        if env_data.DOCLING_ARTIFACTS_PATH:
+            # Layout and table models from `docling-tools models download`, instead of the hub.
+            pipeline_options.artifacts_path = env_data.DOCLING_ARTIFACTS_PATH
+        pipeline_options.do_ocr = config.do_ocr
+        pipeline_options.do_table_structure = config.do_table_structure
+        pipeline_options.table_structure_options.do_cell_matching = config.do_cell_matching
+        ocr_options = dict(
+            det_model_path=self.model_path(config.det_model),
+            rec_model_path=self.model_path(config.rec_model),
+            cls_model_path=self.model_path(config.cls_model),
+            use_cls=config.use_cls,
+        )
+        if "rapidocr_params" in RapidOcrOptions.model_fields:
+            # Newer Docling (RapidOCR 3) takes engine settings directly; older versions leave ORT's default.
+            ocr_options["rapidocr_params"] = {"EngineConfig.onnxruntime.inter_op_num_threads": config.inter_op_threads}
+        pipeline_options.ocr_options = RapidOcrOptions(**ocr_options)
+        pipeline_options.table_structure_options.mode = config.table_mode
+        pipeline_options.images_scale = config.images_scale
+        return pipeline_options
+
+    def get_converter(self, config: PipelineConfig = DEFAULT_PIPELINE):
+        with self._lock:
+            converter = self._converters.get(config)
+            if converter is None:
+                from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
+                from docling.datamodel.base_models import InputFormat
+                from docling.datamodel.settings import settings as docling_settings
+                from docling.document_converter import DocumentConverter, ImageFormatOption, PdfFormatOption
+
+                # Docling's own per-stage timings (page_ocr, layout, table_structure...) feed the trace spans.
+                docling_settings.debug.profile_pipeline_timings = tracer.enabled
+                pipeline_options = self.build_pipeline_options(config)
+                converter = DocumentConverter(
+                    format_options={
+                        InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options, backend=PyPdfiumDocumentBackend),
+                        InputFormat.IMAGE: ImageFormatOption(pipeline_options=pipeline_options)
+                    }
+                )
+                self.load_counts["converter"] += 1
+
+                # Load the OCR sessions, layout and table models now instead of on the first convert().
+                for input_format in (InputFormat.PDF, InputFormat.IMAGE):
+                    converter.initialize_pipeline(input_format)
+                self.load_counts["pipeline"] += 1
+
+                self._converters[config] = converter
+            return converter
+
+    def get_embedding_model(self, model_name: str):
+        with self._lock:
+            model = self._embedding_models.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name, device="cpu")
+                self._embedding_models[model_name] = model
+                self.load_counts["embedding_model"] += 1
+            return model
+
+    def warm_up(self, config: PipelineConfig = DEFAULT_PIPELINE):
+        self.get_converter(config)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.load_counts, loaded_configs=len(self._converters), loaded_embedding_models=len(self._embedding_models))
+
+
+def model_files(configs: List[PipelineConfig]) -> List[str]:
+    """Repo-relative paths of every ONNX file the given configs use."""
+    paths = []
+    for config in configs:
+        for field in fields(PipelineConfig):
+            if field.name.endswith("_model") and getattr(config, field.name) not in paths:
+                paths.append(getattr(config, field.name))
+    return paths
+
+
+model_registry = ModelRegistry()
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python -m utlity.model_registry <model_dir>")
+        sys.exit(2)
+
+    # Pre-populates a directory for OCR_MODEL_DIR, e.g. while building an offline image.
+    from huggingface_hub import snapshot_download
+    files = model_files(list(PROFILES.values()))
+    snapshot_download(repo_id=RAPIDOCR_REPO, local_dir=sys.argv[1], allow_patterns=files)
+    for path in files:
+        print(os.path.join(sys.argv[1], path))
+
+
+if __name__ == "__main__":
+    main()
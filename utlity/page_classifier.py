@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+
+MIN_CHARS = 32
+MIN_TEXT_COVERAGE = 0.02
+MAX_IMAGE_COVERAGE = 0.5
+
+
+@dataclass
+class PageInfo:
+    page_no: int
+    char_count: int
+    text_coverage: float
+    image_coverage: float
+    needs_ocr: bool
+
+
+def _area(box, page_area: float) -> float:
+    left, bottom, right, top = box
+    return max(0.0, right - left) * max(0.0, top - bottom) / page_area
+
+
+def classify_page(page, page_no: int) -> PageInfo:
+    import pypdfium2.raw as pdfium_c
+
+    width, height = page.get_size()
+    page_area = max(width * height, 1.0)
+
+    textpage = page.get_textpage()
+    try:
+        char_count = textpage.count_chars()
+        text_coverage = sum(_area(textpage.get_rect(i), page_area) for i in range(textpage.count_rects()))
+    finally:
+        textpage.close()
+
+    image_coverage = sum(
+        _area(obj.get_pos(), page_area)
+        for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE], max_depth=2)
+    )
+
+    # A page needs OCR when it has no usable text layer, or when it is mostly
+    # image with only a sliver of text (e.g. a scan with a stamped page number).
+    needs_ocr = char_count < MIN_CHARS or (image_coverage >= MAX_IMAGE_COVERAGE and text_coverage < MIN_TEXT_COVERAGE)
+
+    return PageInfo(
+        page_no=page_no,
+        char_count=char_count,
+        text_coverage=min(text_coverage, 1.0),
+        image_coverage=min(image_coverage, 1.0),
+        needs_ocr=needs_ocr
+    )
+
+
+def classify_pages(filepath: str) -> List[PageInfo]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(filepath)
+    try:
+        pages = []
+        for i in range(len(pdf)):
+            page = pdf[i]
+            try:
+                pages.append(classify_page(page, i + 1))
+            finally:
+                page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+def group_pages(pages: List[PageInfo]) -> List[Tuple[Tuple[int, int], bool]]:
+    """Collapse consecutive pages with the same OCR decision into 1-based inclusive ranges."""
+    runs = []
+    for page in pages:
+        if runs and runs[-1][1] == page.needs_ocr and runs[-1][0][1] == page.page_no - 1:
+            (start, _), needs_ocr = runs[-1]
+            runs[-1] = ((start, page.page_no), needs_ocr)
+        else:
+            runs.append(((page.page_no, page.page_no), page.needs_ocr))
+    return runs
+
+
+def max_page_size(filepath: str) -> Tuple[float, float]:
+    """Largest (width, height) in PDF points, read from the page boxes without loading any page."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(filepath)
+    try:
+        sizes = [pdf.get_page_size(i) for i in range(len(pdf))]
+    finally:
+        pdf.close()
+    return max(sizes, key=lambda size: size[0] * size[1], default=(0.0, 0.0))
@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+import atexit
+import multiprocessing
+import threading
+from utlity.tracing import docling_timings, record_docling_timings, tracer
+
+
+PAGE_DELIMITER = "\n\n"
+
+# One pool per process; workers build a converter for each pipeline config (OCR profile) they're handed.
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# Set inside each worker process by _init_worker.
+_worker_processor = None
+
+
+def _init_worker(pipeline_config, workers: int):
+    global _worker_processor
+    from utlity.documnet_proesser import DocumentProcessor
+
+    # Each worker owns preloaded converters; pages only pay for conversion.
+    _worker_processor = DocumentProcessor(pipeline_config=pipeline_config, cache=None, workers=1)
+    # The pool's workers convert side by side, so each gets its share of the cores.
+    _worker_processor.registry.concurrency = workers
+    # Worker spans would be orphaned roots; only the parent process writes the trace file.
+    tracer.trace_file = None
+    _worker_processor.registry.warm_up(pipeline_config)
+    if pipeline_config.skip_text_layer_pages:
+        _worker_processor.registry.warm_up(pipeline_config.text_layer_variant())
+
+
+def _convert_range(filepath: str, page_range: Tuple[int, int], pipeline_config) -> Dict:
+    converter = _worker_processor.registry.get_converter(pipeline_config)
+    result = converter.convert(filepath, page_range=page_range)
+    summary = _worker_processor.summarize_document(result.document)
+    # Spans can't cross the process boundary, so the raw timings travel back with the summary.
+    summary["timings"] = docling_timings(result) if tracer.enabled else {}
+    return summary
+
+
+def get_pool(pipeline_config, workers: int) -> ProcessPoolExecutor:
+    """The process's conversion pool, warmed up with ``pipeline_config``; other configs load on first use.
+
+    Asking for a different worker count replaces the pool; tasks already
+    submitted to the old one still finish.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(pipeline_config, workers)
+            )
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def split_pages(page_range: Tuple[int, int], pages_per_task: int) -> List[Tuple[int, int]]:
+    # Docling page ranges are 1-based and inclusive.
+    first, last = page_range
+    return [
+        (start, min(start + pages_per_task - 1, last))
+        for start in range(first, last + 1, pages_per_task)
+    ]
+
+
+def merge_summaries(summaries: List[Dict]) -> Dict:
+    merged = {"text": [], "page_spans": [], "page_count": 0, "tables": [], "images": []}
+    offset = 0
+    for summary in summaries:
+        if summary["text"]:
+            if merged["text"]:
+                offset += len(PAGE_DELIMITER)
+            merged["page_spans"].extend(
+                (page_no, start + offset, end + offset) for page_no, start, end in summary.get("page_spans", [])
+            )
+            merged["text"].append(summary["text"])
+            offset += len(summary["text"])
+        merged["page_count"] += summary["page_count"]
+        for table in summary["tables"]:
+            merged["tables"].append(dict(table, table_id=len(merged["tables"]) + 1))
+        for image in summary["images"]:
+            merged["images"].append(dict(image, image_id=len(merged["images"]) + 1))
+
+    merged["text"] = PAGE_DELIMITER.join(merged["text"])
+    return merged
+
+
+def parallel_convert(filepath: str, tasks: List[Tuple[Tuple[int, int], object]], pipeline_config, workers: int,
+                     progress=None) -> Dict:
+    """Convert (page_range, pipeline_config) tasks on a process pool and merge the results in page order.
+
+    ``progress(page_range)`` is called as each task completes, in completion order.
+    """
+    pool = get_pool(pipeline_config, workers)
+    futures = [pool.submit(_convert_range, filepath, page_range, config) for page_range, config in tasks]
+    if progress is not None:
+        ranges = {future: page_range for future, (page_range, _) in zip(futures, tasks)}
+        for future in as_completed(futures):
+            progress(ranges[future])
+
+    summaries = [future.result() for future in futures]
+    for summary in summaries:
+        record_docling_timings(summary.pop("timings", {}))
+
+    merged = merge_summaries(summaries)
+    merged["workers"] = workers
+    return merged
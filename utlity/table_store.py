@@ -0,0 +1,165 @@
+import io
+import json
+import os
+import shutil
+import threading
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from utlity.bm25_index import check_collection_name, tokenize
+from utlity.context_packer import TABLE_PREFIX
+from utlity.env_load import env_data
+
+if TYPE_CHECKING:
+    # pandas and pyarrow load on first use; chromadb.py imports this module at start-up.
+    import pandas as pd
+
+
+# Query words that say nothing about which rows are wanted.
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it of on or show the this to was were what when "
+    "where which who why with list give tell me all each per table row rows column columns value values".split()
+)
+
+
+def table_frame(table: Dict) -> "pd.DataFrame":
+    """DataFrame of an extracted table: {"columns", "rows"}, or legacy {"csv_data"} entries."""
+    import pandas as pd
+
+    if "rows" in table:
+        return pd.DataFrame(table["rows"], columns=table["columns"], dtype=str)
+    return pd.read_csv(io.StringIO(table["csv_data"]), dtype=str, keep_default_na=False)
+
+
+def table_digest_bytes(table: Dict) -> bytes:
+    if "rows" in table:
+        return json.dumps([table["columns"], table["rows"]], separators=(",", ":")).encode("utf-8")
+    return table["csv_data"].encode("utf-8")
+
+
+def render_rows(frame: "pd.DataFrame") -> str:
+    return TABLE_PREFIX + frame.to_csv(index=False).rstrip("\n")
+
+
+def iter_table_chunks(frame: "pd.DataFrame", chunk_size: int) -> Iterator[Tuple[str, int, int]]:
+    """Yield (text, row_start, row_end) row groups of about ``chunk_size`` words, each with the header.
+
+    Rows are never split, so a retrieved chunk always maps back to whole rows.
+    """
+    if frame.empty:
+        return
+    # Sized on rendered rows, the same text the embedder will see.
+    sample = frame.head(50)
+    words_per_row = max(1.0, len(sample.to_csv(index=False, header=False).split()) / len(sample))
+    rows_per_chunk = max(1, int(chunk_size // words_per_row))
+    for start in range(0, len(frame), rows_per_chunk):
+        end = min(start + rows_per_chunk, len(frame))
+        yield render_rows(frame.iloc[start:end]), start, end
+
+
+class TableStore:
+    """Cleaned tables persisted as Parquet, one file per (parent_doc_id, table_id).
+
+    Chunks only carry a row range; at question time the rows that match the
+    question are read back from here instead of relying on CSV text chunks.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _dir(self, parent_doc_id: str) -> str:
+        return os.path.join(self.root, parent_doc_id)
+
+    def _path(self, parent_doc_id: str, table_id: int) -> str:
+        return os.path.join(self._dir(parent_doc_id), f"table_{table_id}.parquet")
+
+    def put(self, parent_doc_id: str, table_id: int, frame: "pd.DataFrame"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = self._path(parent_doc_id, table_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Parquet needs string column names; Docling can produce integer or duplicate headers.
+        columns = []
+        for i, column in enumerate(frame.columns):
+            name = str(column) or f"column_{i + 1}"
+            columns.append(name if name not in columns else f"{name}_{i + 1}")
+        table = pa.Table.from_pandas(frame.set_axis(columns, axis=1), preserve_index=False)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+
+    def get(self, parent_doc_id: str, table_id: int, columns: List[str] = None) -> Optional["pd.DataFrame"]:
+        import pyarrow.parquet as pq
+
+        path = self._path(parent_doc_id, table_id)
+        if not os.path.exists(path):
+            return None
+        return pq.read_table(path, columns=columns).to_pandas()
+
+    def tables(self, parent_doc_id: str) -> List[int]:
+        try:
+            names = os.listdir(self._dir(parent_doc_id))
+        except OSError:
+            return []
+        return sorted(int(name[6:-8]) for name in names if name.startswith("table_") and name.endswith(".parquet"))
+
+    @staticmethod
+    def match_rows(frame: "pd.DataFrame", query: str, max_rows: int) -> np.ndarray:
+        """Positions of the rows matching the most query terms, in table order; empty when none match.
+
+        Terms found in most rows (a shared "INV" prefix, a status column) don't pick rows and are ignored.
+        """
+        terms = [term for term in set(tokenize(query)) if term not in STOPWORDS and len(term) > 1]
+        if not terms or frame.empty:
+            return np.array([], dtype=int)
+
+        lowered = [frame[column].astype(str).str.lower() for column in frame.columns]
+        scores = np.zeros(len(frame), dtype=np.int32)
+        for term in terms:
+            hit = np.zeros(len(frame), dtype=bool)
+            for column in lowered:
+                hit |= column.str.contains(term, regex=False).to_numpy()
+            if len(frame) > 2 and hit.mean() > 0.5:
+                continue
+            scores += hit
+
+        best = scores.max()
+        if not best:
+            return np.array([], dtype=int)
+        return np.flatnonzero(scores == best)[:max_rows]
+
+    def slice(self, parent_doc_id: str, table_id: int, query: str, row_range: Tuple[int, int] = None,
+              max_rows: int = None) -> Optional[str]:
+        """Header plus the rows that match ``query``, falling back to ``row_range``; None if the table isn't stored."""
+        frame = self.get(parent_doc_id, table_id)
+        if frame is None:
+            return None
+        max_rows = max_rows or env_data.TABLE_SLICE_ROWS
+
+        rows = self.match_rows(frame, query, max_rows)
+        if len(rows):
+            return render_rows(frame.iloc[rows])
+        start, end = row_range or (0, max_rows)
+        return render_rows(frame.iloc[start:min(end, start + max_rows)])
+
+    def delete_document(self, parent_doc_id: str):
+        shutil.rmtree(self._dir(parent_doc_id), ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_table_store(collection_name: str) -> TableStore:
+    check_collection_name(collection_name)
+    with _stores_lock:
+        store = _stores.get(collection_name)
+        if store is None:
+            store = TableStore(os.path.join(env_data.CACHE_DIR, "tables", collection_name))
+            _stores[collection_name] = store
+        return store
@@ -0,0 +1,207 @@
+import contextvars
+import json
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from utlity.env_load import env_data
+
+
+# Upper bounds (seconds) of the Prometheus histogram buckets.
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "duration", "children", "_token", "_tracer")
+
+    def __init__(self, tracer, name: str, attrs: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = None
+        self.duration = None
+        self.children = []
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.time() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        parent = self._token.old_value if self._token.old_value is not contextvars.Token.MISSING else None
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited in a different context (e.g. a generator resumed elsewhere); parent is still known.
+            pass
+        self._tracer._finish(self, parent)
+        return False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "attrs": self.attrs,
+            "children": [child.as_dict() for child in self.children]
+        }
+
+
+class _NoopSpan:
+    """Returned by Tracer.span when tracing is off: no clock reads, no allocation."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Nested timing spans for the ingestion and question pipelines.
+
+    Spans started inside another span (in the same thread, asyncio task or a
+    context copied by asyncio.to_thread) become its children. Finished root
+    spans are kept in memory for the UI and appended to ``trace_file`` as
+    JSONL; every span also feeds a per-stage histogram exported in
+    Prometheus text format.
+    """
+
+    def __init__(self, enabled: bool = False, trace_file: str = None, keep: int = 50):
+        self.enabled = enabled
+        self.trace_file = trace_file or None
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=keep)
+        self._histograms = {}
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def record(self, name: str, seconds: float, **attrs):
+        """Add an already measured duration as a child of the current span."""
+        if not self.enabled:
+            return
+        span = Span(self, name, attrs)
+        span.start = time.time() - seconds
+        span.duration = seconds
+        self._finish(span, _current.get())
+
+    def _observe(self, name: str, seconds: float):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+    def _finish(self, span: Span, parent: Optional[Span]):
+        with self._lock:
+            self._observe(span.name, span.duration)
+            if parent is not None:
+                parent.children.append(span)
+                return
+
+            trace = span.as_dict()
+            self._recent.append(trace)
+            if self.trace_file:
+                with open(self.trace_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace, default=str) + "\n")
+
+    def recent(self, name: str = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [trace for trace in self._recent if name is None or trace["name"] == name]
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            histograms = {name: dict(h, buckets=list(h["buckets"])) for name, h in self._histograms.items()}
+        return prometheus_text(histograms)
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._histograms.clear()
+
+
+def breakdown(trace: Dict[str, Any]) -> Dict[str, float]:
+    """Total seconds per span name below a trace root, e.g. for a per-document timing table."""
+    totals = {}
+    stack = list(trace["children"])
+    while stack:
+        span = stack.pop()
+        totals[span["name"]] = totals.get(span["name"], 0.0) + span["duration"]
+        stack.extend(span["children"])
+    return totals
+
+
+def prometheus_text(histograms: Dict[str, Dict[str, Any]]) -> str:
+    lines = [
+        "# HELP docqa_stage_seconds Time spent in each pipeline stage.",
+        "# TYPE docqa_stage_seconds histogram"
+    ]
+    for name in sorted(histograms):
+        histogram = histograms[name]
+        for bound, count in zip(BUCKETS, histogram["buckets"]):
+            lines.append(f'docqa_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+        lines.append(f'docqa_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram["count"]}')
+        lines.append(f'docqa_stage_seconds_sum{{stage="{name}"}} {histogram["sum"]:.6f}')
+        lines.append(f'docqa_stage_seconds_count{{stage="{name}"}} {histogram["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def docling_timings(result) -> Dict[str, List[float]]:
+    """Per-stage times from a Docling ConversionResult converted with profile_pipeline_timings."""
+    timings = getattr(result, "timings", None) or {}
+    return {key: list(item.times) for key, item in timings.items()}
+
+
+def record_docling_timings(timings: Dict[str, List[float]]):
+    # Page-scoped models (page_ocr, page_layout, table_structure...) report one time per page batch.
+    for key, times in timings.items():
+        tracer.record(f"docling.{key}", sum(times), count=len(times), times=[round(t, 4) for t in times])
+
+
+tracer = Tracer(enabled=env_data.TRACING, trace_file=env_data.TRACE_FILE)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python -m utlity.tracing <trace.jsonl>")
+        sys.exit(2)
+
+    # Replays a JSONL trace file into Prometheus text, e.g. for a node_exporter textfile collector.
+    replay = Tracer(enabled=True)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            stack = [json.loads(line)]
+            while stack:
+                span = stack.pop()
+                replay._observe(span["name"], span["duration"])
+                stack.extend(span["children"])
+    print(replay.prometheus_text(), end="")
+
+
+if __name__ == "__main__":
+    main()
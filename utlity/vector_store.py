@@ -0,0 +1,213 @@
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from utlity.env_load import env_data
+
+
+BACKENDS = ("cloud", "persistent", "memory", "numpy")
+
+
+def hnsw_metadata(ef: int = None, m: int = None, construction_ef: int = None) -> Dict[str, Any]:
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:search_ef": ef or env_data.HNSW_EF,
+        "hnsw:construction_ef": construction_ef or env_data.HNSW_CONSTRUCTION_EF,
+        "hnsw:M": m or env_data.HNSW_M
+    }
+
+
+def create_client(backend: str = None):
+    backend = backend or env_data.VECTOR_BACKEND
+    if backend == "numpy":
+        return NumpyClient()
+
+    import chromadb
+    if backend == "cloud":
+        return chromadb.CloudClient(
+            api_key=env_data.CHROMA_API_KEY,
+            tenant=env_data.CHROMA_TENANT,
+            database=env_data.CHROMA_DATABASE
+        )
+    if backend == "persistent":
+        return chromadb.PersistentClient(path=env_data.CHROMA_PATH)
+    if backend == "memory":
+        return chromadb.EphemeralClient()
+    raise ValueError(f"Unknown vector backend '{backend}', expected one of {', '.join(BACKENDS)}")
+
+
+def _matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            for operator, value in condition.items():
+                if operator == "$eq" and metadata.get(key) != value:
+                    return False
+                if operator == "$ne" and metadata.get(key) == value:
+                    return False
+                if operator == "$in" and metadata.get(key) not in value:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class NumpyCollection:
+    """Brute-force cosine index with the subset of the Chroma collection API the app uses.
+
+    Meant for small collections, tests and offline benchmarks: every query is
+    a single matrix-vector product over all stored vectors.
+    """
+
+    def __init__(self, name: str, metadata: Dict[str, Any] = None):
+        self.name = name
+        self.metadata = metadata or {}
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def upsert(self, ids: Sequence[str], embeddings=None, documents: Sequence[str] = None, metadatas: Sequence[Dict] = None):
+        if embeddings is None:
+            raise ValueError("The numpy backend needs explicit embeddings")
+        vectors = self._normalize(embeddings)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+
+        with self._lock:
+            if not self._ids:
+                self._vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+            new_rows = []
+            for i, chunk_id in enumerate(ids):
+                position = self._positions.get(chunk_id)
+                if position is None:
+                    self._positions[chunk_id] = len(self._ids)
+                    self._ids.append(chunk_id)
+                    self._documents.append(documents[i])
+                    self._metadatas.append(metadatas[i])
+                    new_rows.append(vectors[i])
+                else:
+                    self._documents[position] = documents[i]
+                    self._metadatas[position] = metadatas[i]
+                    self._vectors[position] = vectors[i]
+
+            if new_rows:
+                self._vectors = np.vstack([self._vectors, np.stack(new_rows)])
+
+    add = upsert
+
+    def _select(self, ids: Sequence[str] = None, where: Dict = None) -> List[int]:
+        if ids is not None:
+            positions = [self._positions[i] for i in ids if i in self._positions]
+        else:
+            positions = range(len(self._ids))
+        return [p for p in positions if _matches(self._metadatas[p], where)]
+
+    def _rows(self, positions: Sequence[int], include: Sequence[str]) -> Dict[str, list]:
+        rows = {"ids": [self._ids[p] for p in positions]}
+        if "documents" in include:
+            rows["documents"] = [self._documents[p] for p in positions]
+        if "metadatas" in include:
+            rows["metadatas"] = [self._metadatas[p] for p in positions]
+        if "embeddings" in include:
+            rows["embeddings"] = [self._vectors[p] for p in positions]
+        return rows
+
+    def get(self, ids: Sequence[str] = None, where: Dict = None, limit: int = None, offset: int = None,
+            include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, list]:
+        with self._lock:
+            positions = self._select(ids, where)
+            start = offset or 0
+            positions = positions[start:start + limit] if limit is not None else positions[start:]
+            return self._rows(positions, include)
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict = None,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> Dict[str, list]:
+        queries = self._normalize(query_embeddings)
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+
+        with self._lock:
+            candidates = np.asarray(self._select(where=where), dtype=np.int64)
+            for query in queries:
+                if len(candidates) == 0:
+                    top = np.zeros(0, dtype=np.int64)
+                    distances = np.zeros(0, dtype=np.float32)
+                else:
+                    scores = self._vectors[candidates] @ query
+                    k = min(n_results, len(candidates))
+                    top = np.argpartition(-scores, k - 1)[:k]
+                    top = top[np.argsort(-scores[top])]
+                    distances = 1.0 - scores[top]
+                    top = candidates[top]
+
+                rows = self._rows(top.tolist(), include)
+                results["ids"].append(rows["ids"])
+                for key in ("documents", "metadatas", "embeddings"):
+                    if key in rows:
+                        results[key].append(rows[key])
+                results["distances"].append(distances.tolist())
+
+        return {key: value for key, value in results.items() if key == "ids" or key in include}
+
+    def delete(self, ids: Sequence[str] = None, where: Dict = None):
+        with self._lock:
+            removed = set(self._select(ids, where))
+            if not removed:
+                return
+            keep = [p for p in range(len(self._ids)) if p not in removed]
+            self._ids = [self._ids[p] for p in keep]
+            self._documents = [self._documents[p] for p in keep]
+            self._metadatas = [self._metadatas[p] for p in keep]
+            self._vectors = self._vectors[keep]
+            self._positions = {chunk_id: p for p, chunk_id in enumerate(self._ids)}
+
+
+class NumpyClient:
+    """In-process stand-in for a Chroma client backed by NumpyCollection."""
+
+    _collections: Dict[str, NumpyCollection] = {}
+    _lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, metadata: Dict[str, Any] = None, **kwargs) -> NumpyCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = NumpyCollection(name, metadata)
+            return self._collections[name]
+
+    def get_collection(self, name: str, **kwargs) -> NumpyCollection:
+        with self._lock:
+            if name not in self._collections:
+                raise ValueError(f"Collection {name} does not exist.")
+            return self._collections[name]
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            if self._collections.pop(name, None) is None:
+                raise ValueError(f"Collection {name} does not exist.")
+
+    def list_collections(self) -> List[NumpyCollection]:
+        with self._lock:
+            return list(self._collections.values())
+
+    def get_max_batch_size(self) -> int:
+        return 1 << 20